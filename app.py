@@ -1,44 +1,104 @@
-import os
+import time
+_RUN_STARTED = time.perf_counter()  # taken before the imports so the cold start includes them
+
 import sqlite3
+
 import pandas as pd
 import streamlit as st
 from datetime import datetime, date, timedelta
 
-import plotly.express as px  # charts
-
-from scripts.create_tables import create_tables
-from scripts.queries import SQL_QUERIES
+from scripts import archive, db, frames, parallel, perf, rollups, snapshot, validate, writer
+from scripts.cache import QUERY_CACHE, written_tables
+from scripts.changelog import watcher
+from scripts.dates import iso_timestamp, parse_datetime
+from scripts.expiry import EXPIRY_HORIZON_DAYS, MAX_HORIZON_DAYS, bucket_summary_query, expiring_query
+from scripts.load_data import MODES, load_csv
+from scripts.matching import MATCH_INDEX
+from scripts.paging import PAGE_SIZE, count_query, page_count, page_query
+from scripts.queries import AGG_QUERIES, CHART_QUERIES, SQL_QUERIES, WRITE_NAMES, WRITE_QUERIES
 
-DB_PATH = "db/food_wastage.db"
+DB_PATH = db.DB_PATH
 
 # ------------- Utilities -------------
-def get_conn():
-    os.makedirs("db", exist_ok=True)
-    create_tables(DB_PATH)
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
-
 def read_sql(query, params=None):
-    conn = get_conn()
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+    with db.connection(DB_PATH) as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    db.count_query()
+    return frames.compact(df)
+
+def after_commit(query, params, result):
+    # Runs on the writer thread in commit order. Only cached results that
+    # read the written table (or its aggregates) go stale.
+    QUERY_CACHE.bump(*written_tables(query))
+    MATCH_INDEX.apply_write(query, params, result[0])
+
+def sync_changes():
+    # Writes from other processes (the API, the CSV loader) arrive through the
+    # change log; this process's own saves were applied in after_commit
+    with db.connection(DB_PATH) as conn:
+        changed = watcher(DB_PATH).poll(conn, writer.get_writer(DB_PATH).logged_since)
+    if changed:
+        QUERY_CACHE.bump(*changed)
+    if changed & {"receivers", "food_listings", "claims"}:
+        MATCH_INDEX.invalidate()
 
 def exec_sql(query, params=None):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(query, params or [])
-    conn.commit()
-    conn.close()
-
-@st.cache_data
-def cached_read(query, params_tuple=None, _ts=None):
-    return read_sql(query, params_tuple)
-
-def cache_bust():
-    st.session_state["ts"] = datetime.now().isoformat()
+    # Queued to the single writer thread, which batches saves from every
+    # session into one transaction; returns (lastrowid, rowcount) and raises
+    # the statement's sqlite3 error.
+    started = time.perf_counter()
+    rowcount = None
+    try:
+        lastrowid, rowcount = writer.execute(query, params, DB_PATH, on_commit=after_commit)
+    finally:
+        perf.PROFILE.record(WRITE_NAMES.get(query) or perf.query_label(query), time.perf_counter() - started,
+                            rows=rowcount, kind="write", sql=query)
+    return lastrowid, rowcount
+
+def form_errors(table, row, mode="upsert"):
+    # Same rules as the CSV loader, for one form row
+    with db.connection(DB_PATH) as conn:
+        return validate.check_row(conn, table, row, mode)
+
+def delete_row(query, key, label, missing="not found"):
+    # Foreign keys are enforced, so parents with children cannot be deleted
+    try:
+        _, rowcount = exec_sql(query, (key,))
+    except sqlite3.IntegrityError:
+        st.error(f"{label} {key} is still referenced; delete or reassign its dependent rows first.")
+    else:
+        if rowcount:
+            st.success(f"{label} {key} deleted.")
+        else:
+            st.warning(f"{label} {key} {missing}; nothing deleted.")
+
+def match_index():
+    with db.connection(DB_PATH) as conn:
+        MATCH_INDEX.ensure_loaded(conn)
+    return MATCH_INDEX
+
+def cached_read(query, params_tuple=None, label=None):
+    # Every read in the app comes through here, so this is where it is profiled
+    started = time.perf_counter()
+    loaded = []
+
+    def load(q, p):
+        df = read_sql(q, p)
+        loaded.append(int(df.memory_usage(deep=True).sum()))
+        return df
+
+    df = QUERY_CACHE.get_or_load(query, params_tuple, load)
+    perf.PROFILE.record(label or perf.query_label(query), time.perf_counter() - started, rows=len(df),
+                        nbytes=loaded[0] if loaded else 0, cache="miss" if loaded else "hit", sql=query)
+    return df
 
-def ts():
-    return st.session_state.get("ts", "0")
+# Closed claims older than archive.ARCHIVE_AFTER_DAYS move to monthly
+# partitions on a background thread, once per process
+db.ensure_schema(DB_PATH)
+archive.start_scheduler(DB_PATH, on_archived=lambda moved: QUERY_CACHE.bump("claims"))
+# Drops hourly/daily rollups past their retention
+rollups.start_scheduler(DB_PATH, on_downsampled=lambda dropped: QUERY_CACHE.bump("rollups"))
+sync_changes()  # once per rerun, before anything is read
 
 # ------------- Page -------------
 st.set_page_config(page_title="Local Food Wastage Management", layout="wide")
@@ -52,128 +112,250 @@ with st.sidebar:
     food_file = st.file_uploader("food_listings_data.csv", type=["csv"], key="food")
     claim_file = st.file_uploader("claims_data.csv", type=["csv"], key="claim")
 
+    load_mode = st.selectbox("Load mode", MODES, index=MODES.index("replace"),
+                             help="replace: empty the table first; upsert: update rows with matching IDs")
+
     if st.button("📥 Load Uploaded CSVs"):
-        conn = get_conn()
-        if prov_file: pd.read_csv(prov_file).to_sql("providers", conn, if_exists="replace", index=False)
-        if recv_file: pd.read_csv(recv_file).to_sql("receivers", conn, if_exists="replace", index=False)
-        if food_file: pd.read_csv(food_file).to_sql("food_listings", conn, if_exists="replace", index=False)
-        if claim_file: pd.read_csv(claim_file).to_sql("claims", conn, if_exists="replace", index=False)
-        conn.close()
-        cache_bust()
+        uploads = [("providers", prov_file), ("receivers", recv_file),
+                   ("food_listings", food_file), ("claims", claim_file)]
+        with db.connection(DB_PATH) as conn:
+            for table, upload in uploads:
+                if upload:
+                    res = load_csv(conn, table, upload, mode=load_mode)
+                    QUERY_CACHE.bump(table)
+                    MATCH_INDEX.invalidate()
+                    st.caption(f"{table}: {res['rows']} rows ({res['rows_per_sec']} rows/s)")
+                    if res["rejected"]:
+                        report = pd.DataFrame(res["report"], columns=["Row", "Column", "Reason", "Value"])
+                        st.warning(f"{table}: {res['rejected']} rows rejected")
+                        st.dataframe(report, use_container_width=True)
+                        st.download_button(f"Rejected {table} rows (CSV)", report.to_csv(index=False),
+                                           file_name=f"{table}_rejected.csv", key=f"rej_{table}")
+                    for child, n in res["orphaned"].items():
+                        st.warning(f"{n} {child} rows point at {table} rows that are no longer there.")
         st.success("CSV(s) loaded and DB updated.")
 
     st.divider()
     st.header("🔎 Dashboard Filter")
     city_filter = st.text_input("City for provider contacts", value="")
+    analytics_mode = st.checkbox(
+        "Run SQL outputs on columnar snapshot", value=False, disabled=not snapshot.available(),
+        help="Answers the SQL Query Outputs from memory-mapped Arrow snapshots instead of the live "
+             "database" + ("" if snapshot.available() else " (needs pyarrow)"),
+    )
+    snapshot_max_age = st.number_input("Snapshot max age (seconds)", min_value=10,
+                                       value=snapshot.SNAPSHOT_MAX_AGE, step=30, disabled=not analytics_mode)
+    query_mode = st.selectbox("Dashboard queries", parallel.MODES, index=parallel.MODES.index("sequential"),
+                              help="thread/process: run the dashboard reads in parallel on read-only "
+                                   "connections and fill each chart/table as it finishes; on small "
+                                   "databases the extra connections cost more than they save")
 
-tabs = st.tabs(["📊 Dashboard", "🏪 Providers", "👥 Receivers", "🍱 Food Listings", "📦 Claims"])
-
-# ===== Helper: live table readers (no cache for CRUD tables) =====
-def table_df(table_name):
-    return read_sql(f"SELECT * FROM {table_name}")
-
-# ===== Derived queries for charts =====
-def df_provider_types():
-    return read_sql("SELECT Type, COUNT(*) AS contributions FROM providers GROUP BY Type ORDER BY contributions DESC")
-
-def df_food_types():
-    return read_sql("SELECT Food_Type, COUNT(*) AS count FROM food_listings GROUP BY Food_Type ORDER BY count DESC")
-
-def df_claim_status_pct():
-    return read_sql("""
-        SELECT Status, ROUND(100.0 * COUNT(*) / (SELECT COUNT(*) FROM claims), 2) AS percentage
-        FROM claims GROUP BY Status
-    """)
-
-def df_city_listings():
-    return read_sql("""
-        SELECT Location AS City, COUNT(*) AS listings
-        FROM food_listings
-        GROUP BY Location
-        ORDER BY listings DESC
-        LIMIT 10
-    """)
-
-def df_completed_claims_over_time():
-    # Daily completed claims trend
-    return read_sql("""
-        SELECT date(Timestamp) AS day, COUNT(*) AS completed
-        FROM claims
-        WHERE Status='Completed' AND Timestamp IS NOT NULL
-        GROUP BY date(Timestamp)
-        ORDER BY day
-    """)
+    st.divider()
+    st.caption(
+        f"DB: {db.stats['opens']} connection opens, {db.stats['queries']} queries "
+        f"since start (schema init x{db.stats['schema_inits']})"
+    )
+    cache_info = QUERY_CACHE.info()
+    st.caption(
+        f"Query cache: {cache_info['hits']} hits, {cache_info['misses']} misses, "
+        f"{cache_info['invalidations']} invalidated, {cache_info['evictions']} evicted; "
+        f"{cache_info['entries']} entries / {cache_info['bytes'] / 1e6:.1f} MB"
+    )
+    write_info = writer.get_writer(DB_PATH).stats
+    st.caption(
+        f"Writer: {write_info['writes']} writes in {write_info['batches']} transactions "
+        f"(largest {write_info['max_batch']}), {write_info['errors']} failed"
+    )
+    if perf.stats["reruns"]:
+        st.caption(
+            f"Cold start {perf.stats['cold_start_ms']:.0f} ms; previous rerun "
+            f"{perf.stats['last_rerun_ms']:.0f} ms ({perf.stats['last_view']})"
+        )
+    if perf.is_admin():
+        with st.expander("🧪 Query profile"):
+            summary = perf.PROFILE.summary()
+            if summary:
+                st.dataframe(pd.DataFrame(summary), use_container_width=True)
+            else:
+                st.caption("No queries recorded yet.")
+            st.download_button("⬇️ Export JSONL", perf.PROFILE.to_jsonl(),
+                               file_name="query_profile.jsonl", mime="application/x-ndjson")
+            if st.button("Clear profile"):
+                perf.PROFILE.clear()
+            st.caption("SQL trace on" if perf.TRACE_SQL else f"SQL trace off (set {perf.TRACE_ENV}=1)")
+            st.caption(f"Shared category dictionaries: {frames.dictionary_sizes()}")
+
+# Only the selected view runs on a rerun (st.tabs executes every tab's queries each time)
+VIEW_NAMES = ["📊 Dashboard", "🏪 Providers", "👥 Receivers", "🍱 Food Listings", "📦 Claims"]
+view = st.radio("View", VIEW_NAMES, horizontal=True, key="view", label_visibility="collapsed")
+
+# ===== Helper: live table readers =====
+def table_page(table_name, search, key):
+    # Search, ordering and paging run in SQLite; only the visible page is fetched
+    count_sql, count_params = count_query(table_name, search)
+    total = int(cached_read(count_sql, count_params, f"{table_name} count").iloc[0, 0])
+    pages = page_count(total, PAGE_SIZE)
+    page = st.number_input(f"Page (1–{pages})", min_value=1, max_value=pages, value=1, step=1,
+                           key=f"{key}_page")
+    sql, params = page_query(table_name, search, page, PAGE_SIZE)
+    df = cached_read(sql, params, f"{table_name} page")
+    start = (page - 1) * PAGE_SIZE
+    st.caption(f"Rows {start + 1 if total else 0}–{start + len(df)} of {total}")
+    return df
+
+def df_expiry_alerts(days=EXPIRY_HORIZON_DAYS, city=None):
+    return cached_read(*expiring_query(days=days, city=city or None), label="expiry alerts")
+
+def df_expiry_buckets(days=EXPIRY_HORIZON_DAYS, city=None):
+    return cached_read(*bucket_summary_query(days=days, city=city or None), label="expiry buckets")
+
+# ===== Dashboard reads: cache first, misses on the parallel executor =====
+def run_reads(jobs, on_result):
+    # jobs: {key: (query, params, label)}; on_result(key, df, error) as each finishes
+    if query_mode == "sequential":
+        for key, (query, params, label) in jobs.items():
+            try:
+                on_result(key, cached_read(query, params, label), None)
+            except Exception as e:
+                on_result(key, None, e)
+        return
+
+    pending = {}
+    for key, (query, params, label) in jobs.items():
+        hit, found = QUERY_CACHE.lookup(query, params)
+        if hit:
+            perf.PROFILE.record(label, 0, rows=len(found), nbytes=0, cache="hit", sql=query)
+            on_result(key, found, None)
+        else:
+            pending[key] = (query, params, label, found)
+    if not pending:
+        return
+
+    batch = parallel.get_executor(DB_PATH, query_mode).submit(
+        {key: (query, params) for key, (query, params, _, _) in pending.items()}
+    )
+    try:
+        for key, result, error in batch.as_completed():
+            query, params, label, token = pending[key]
+            if error is not None:
+                on_result(key, None, error)
+                continue
+            columns, rows, seconds = result
+            df = frames.compact(pd.DataFrame.from_records(rows, columns=columns))
+            QUERY_CACHE.store(token, df)
+            db.count_query()
+            perf.PROFILE.record(label, seconds, rows=len(df), nbytes=int(df.memory_usage(deep=True).sum()),
+                                cache="miss", sql=query)
+            on_result(key, df, None)
+    finally:
+        # Also reached when Streamlit abandons this run for a newer rerun
+        batch.cancel()
 
 # ---------- Dashboard ----------
-with tabs[0]:
+def render_dashboard():
+    import plotly.express as px  # only the dashboard draws charts
+
     st.subheader("📈 Visual Insights")
 
+    charts = {
+        "Provider types": (
+            lambda df: px.bar(df, x="Type", y="contributions", title="Top Provider Types (Count)"),
+            "No provider data available for chart."),
+        "Claim status percentage": (
+            lambda df: px.pie(df, names="Status", values="percentage", title="Claim Status (%)", hole=0.35),
+            "No claims data available for chart."),
+        "Food types": (
+            lambda df: px.bar(df, x="Food_Type", y="count", title="Most Common Food Types"),
+            "No food listings for chart."),
+        "Completed claims over time": (
+            lambda df: px.line(df, x="day", y="completed", title="Completed Claims Over Time"),
+            "No completed claims trend available."),
+    }
     colA, colB = st.columns(2)
-    with colA:
-        df_pt = df_provider_types()
-        if not df_pt.empty:
-            fig = px.bar(df_pt, x="Type", y="contributions", title="Top Provider Types (Count)")
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No provider data available for chart.")
-
-    with colB:
-        df_cs = df_claim_status_pct()
-        if not df_cs.empty:
-            fig = px.pie(df_cs, names="Status", values="percentage", title="Claim Status (%)", hole=0.35)
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No claims data available for chart.")
-
     colC, colD = st.columns(2)
-    with colC:
-        df_ft = df_food_types()
-        if not df_ft.empty:
-            fig = px.bar(df_ft, x="Food_Type", y="count", title="Most Common Food Types")
-            st.plotly_chart(fig, use_container_width=True)
+    slots = {("chart", name): col.empty() for name, col in zip(charts, (colA, colB, colC, colD))}
+    jobs = {("chart", name): (CHART_QUERIES[name], None, f"chart: {name}") for name in charts}
+
+    st.markdown("**Trends by provider or city**")
+    t1, t2, t3, t4 = st.columns(4)
+    trend_dim = t1.selectbox("By", rollups.DIMENSIONS, key="trend_dim")
+    trend_key = t2.text_input("Provider_ID" if trend_dim == "provider" else "City", key="trend_key").strip()
+    trend_start = t3.date_input("From", value=date.today() - timedelta(days=90), key="trend_start")
+    trend_grain = t4.selectbox("Grain", ["auto", *rollups.GRAINS], key="trend_grain",
+                               help="auto: the finest grain still kept for the start date")
+    if trend_key:
+        # One primary-key range read on the rollups table, whatever the span
+        start, end = datetime.combine(trend_start, datetime.min.time()), datetime.now()
+        grain = rollups.grain_for(start) if trend_grain == "auto" else trend_grain
+        try:
+            series_query = rollups.series_query(trend_dim, trend_key, grain, start, end)
+        except ValueError as e:
+            st.warning(str(e))
         else:
-            st.info("No food listings for chart.")
-
-    with colD:
-        df_trend = df_completed_claims_over_time()
-        if not df_trend.empty:
-            fig = px.line(df_trend, x="day", y="completed", title="Completed Claims Over Time")
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No completed claims trend available.")
+            df = cached_read(*series_query, label="trend series")
+            data = rollups.shape(df.itertuples(index=False, name=None), grain, start, end)
+            trend = pd.DataFrame(data["series"], index=pd.Index(data["buckets"], name="Bucket"))
+            st.plotly_chart(px.line(trend, title=f"{trend_key} per {grain}"), use_container_width=True)
 
     st.divider()
     st.subheader("🧮 SQL Query Outputs")
 
+    store = snapshot.get_store(DB_PATH, max_age=snapshot_max_age) if analytics_mode else None
+    if store is not None:
+        store.tables()
+        age = store.age()
+        st.caption(
+            f"Columnar snapshot, {age:.0f}s old (refreshed every {snapshot_max_age}s)" if age is not None
+            else f"No snapshot available ({store.stats['error']}); running the live queries"
+        )
+
+    snapshot_outputs = {}
     for name, query in SQL_QUERIES.items():
+        query = AGG_QUERIES.get(name, query)
         st.markdown(f"**{name}**")
+        params = None
         if "WHERE City = ?" in query:
-            if city_filter.strip():
-                df = cached_read(query, (city_filter.strip(),), ts())
-                st.dataframe(df, use_container_width=True)
-            else:
+            if not city_filter.strip():
                 st.info("Enter a city in the sidebar to run this query.")
+                st.divider()
+                continue
+            params = (city_filter.strip(),)
+        slots[("output", name)] = st.empty()
+        if store is not None:
+            snapshot_outputs[("output", name)] = params
         else:
-            df = cached_read(query, None, ts())
-            st.dataframe(df, use_container_width=True)
+            jobs[("output", name)] = (query, params, name)
         st.divider()
 
+    def on_result(key, df, error):
+        kind, name = key
+        slot = slots[key]
+        if error is not None:
+            slot.error(f"{name}: {error}")
+        elif kind == "output":
+            slot.dataframe(df, use_container_width=True)
+        elif df.empty:
+            slot.info(charts[name][1])
+        else:
+            slot.plotly_chart(charts[name][0](df), use_container_width=True)
+
+    for key, params in snapshot_outputs.items():
+        started = time.perf_counter()
+        try:
+            df = store.run(key[1], params or ())
+        except RuntimeError:
+            # Nothing snapshotted yet: answer from the live database instead
+            jobs[key] = (AGG_QUERIES.get(key[1], SQL_QUERIES[key[1]]), params, key[1])
+            continue
+        perf.PROFILE.record(key[1], time.perf_counter() - started, rows=len(df), kind="snapshot")
+        on_result(key, df, None)
+    run_reads(jobs, on_result)
+
 # ---------- Providers CRUD ----------
-with tabs[1]:
+def render_providers():
     st.subheader("🏪 Providers (CRUD)")
     # Search bar
     search = st.text_input("Search providers by name/city/type", key="ps")
-    base_df = table_df("providers")
-    if search:
-        s = search.lower()
-        mask = (
-            base_df["Name"].astype(str).str.lower().str.contains(s) |
-            base_df["City"].astype(str).str.lower().str.contains(s) |
-            base_df["Type"].astype(str).str.lower().str.contains(s)
-        )
-        view_df = base_df[mask]
-    else:
-        view_df = base_df
 
     col1, col2 = st.columns(2)
     with col1:
@@ -189,47 +371,29 @@ with tabs[1]:
                 st.error("Name is required.")
             else:
                 if p_id == 0:
-                    exec_sql("INSERT INTO providers(Name, Type, Address, City, Contact) VALUES (?,?,?,?,?)",
+                    exec_sql(WRITE_QUERIES["insert provider"],
                              (p_name, p_type, p_addr, p_city, p_contact))
                 else:
                     exec_sql(
-                        """INSERT INTO providers(Provider_ID, Name, Type, Address, City, Contact)
-                           VALUES (?,?,?,?,?,?)
-                           ON CONFLICT(Provider_ID) DO UPDATE SET
-                               Name=excluded.Name, Type=excluded.Type, Address=excluded.Address,
-                               City=excluded.City, Contact=excluded.Contact""",
+                        WRITE_QUERIES["upsert provider"],
                         (p_id, p_name, p_type, p_addr, p_city, p_contact)
                     )
-                cache_bust()
                 st.success("Provider saved.")
     with col2:
         del_id = st.number_input("Provider_ID to delete", min_value=0, step=1, key="delp")
         if st.button("🗑️ Delete Provider"):
             if del_id > 0:
-                exec_sql("DELETE FROM providers WHERE Provider_ID = ?", (del_id,))
-                cache_bust()
-                st.success(f"Provider {del_id} deleted.")
+                delete_row(WRITE_QUERIES["delete provider"], del_id, "Provider")
             else:
                 st.error("Enter a valid Provider_ID.")
 
     st.markdown("**Providers**")
-    st.dataframe(view_df.sort_values("Provider_ID"), use_container_width=True)
+    st.dataframe(table_page("providers", search, "ps"), use_container_width=True)
 
 # ---------- Receivers CRUD ----------
-with tabs[2]:
+def render_receivers():
     st.subheader("👥 Receivers (CRUD)")
     search = st.text_input("Search receivers by name/city/type", key="rs")
-    base_df = table_df("receivers")
-    if search:
-        s = search.lower()
-        mask = (
-            base_df["Name"].astype(str).str.lower().str.contains(s) |
-            base_df["City"].astype(str).str.lower().str.contains(s) |
-            base_df["Type"].astype(str).str.lower().str.contains(s)
-        )
-        view_df = base_df[mask]
-    else:
-        view_df = base_df
 
     col1, col2 = st.columns(2)
     with col1:
@@ -243,64 +407,45 @@ with tabs[2]:
                 st.error("Name is required.")
             else:
                 if r_id == 0:
-                    exec_sql("INSERT INTO receivers(Name, Type, City, Contact) VALUES (?,?,?,?)",
+                    exec_sql(WRITE_QUERIES["insert receiver"],
                              (r_name, r_type, r_city, r_contact))
                 else:
                     exec_sql(
-                        """INSERT INTO receivers(Receiver_ID, Name, Type, City, Contact)
-                           VALUES (?,?,?,?,?)
-                           ON CONFLICT(Receiver_ID) DO UPDATE SET
-                               Name=excluded.Name, Type=excluded.Type, City=excluded.City, Contact=excluded.Contact""",
+                        WRITE_QUERIES["upsert receiver"],
                         (r_id, r_name, r_type, r_city, r_contact))
-                cache_bust()
                 st.success("Receiver saved.")
     with col2:
         del_rid = st.number_input("Receiver_ID to delete", min_value=0, step=1, key="delr")
         if st.button("🗑️ Delete Receiver"):
             if del_rid > 0:
-                exec_sql("DELETE FROM receivers WHERE Receiver_ID = ?", (del_rid,))
-                cache_bust()
-                st.success(f"Receiver {del_rid} deleted.")
+                delete_row(WRITE_QUERIES["delete receiver"], del_rid, "Receiver")
             else:
                 st.error("Enter a valid Receiver_ID.")
 
     st.markdown("**Receivers**")
-    st.dataframe(view_df.sort_values("Receiver_ID"), use_container_width=True)
+    st.dataframe(table_page("receivers", search, "rs"), use_container_width=True)
 
 # ---------- Food Listings CRUD + Expiry Alerts ----------
-with tabs[3]:
+def render_food_listings():
     st.subheader("🍱 Food Listings (CRUD)")
     search = st.text_input("Search food by name/city/type/meal", key="fs")
-    base_df = table_df("food_listings")
-
-    # Expiry calculations
-    if not base_df.empty:
-        base_df["Expiry_Date"] = pd.to_datetime(base_df["Expiry_Date"], errors="coerce")
-        today = pd.Timestamp(date.today())
-        base_df["Days_To_Expiry"] = (base_df["Expiry_Date"] - today).dt.days
-    else:
-        base_df["Days_To_Expiry"] = []
-
-    if search:
-        s = search.lower()
-        mask = (
-            base_df["Food_Name"].astype(str).str.lower().str.contains(s) |
-            base_df["Location"].astype(str).str.lower().str.contains(s) |
-            base_df["Food_Type"].astype(str).str.lower().str.contains(s) |
-            base_df["Meal_Type"].astype(str).str.lower().str.contains(s)
-        )
-        view_df = base_df[mask]
-    else:
-        view_df = base_df
 
-    # Alerts section
-    st.markdown("**⏰ Expiry Alerts (≤ 3 days)**")
-    alert_df = base_df[(base_df["Days_To_Expiry"].notna()) & (base_df["Days_To_Expiry"] <= 3)]
+    # Alerts section: unclaimed items expiring from today through the horizon
+    a1, a2 = st.columns(2)
+    horizon = a1.number_input("Alert horizon (days)", min_value=0, max_value=MAX_HORIZON_DAYS,
+                              value=EXPIRY_HORIZON_DAYS, step=1, key="fhorizon")
+    alert_city = a2.text_input("Alert city (blank for all)", key="fcity").strip()
+    st.markdown(f"**⏰ Expiry Alerts (≤ {horizon} days)**")
+    buckets = df_expiry_buckets(horizon, alert_city)
+    if not buckets.empty:
+        st.caption(f"Listed to expire in window: {int(buckets['listings'].sum())} listings, "
+                   f"{int(buckets['quantity'].sum())} units")
+    alert_df = df_expiry_alerts(horizon, alert_city)
     if alert_df.empty:
-        st.success("No items expiring in the next 3 days.")
+        st.success(f"No unclaimed items expiring in the next {horizon} days.")
     else:
-        st.warning("Items expiring soon:")
-        st.dataframe(alert_df.sort_values("Days_To_Expiry"), use_container_width=True)
+        st.warning("Unclaimed items expiring soon:")
+        st.dataframe(alert_df, use_container_width=True)
 
     col1, col2 = st.columns(2)
     with col1:
@@ -314,103 +459,119 @@ with tabs[3]:
         f_ftype = st.text_input("Food_Type (Veg/Non-Veg/Vegan...)")
         f_meal = st.text_input("Meal_Type (Breakfast/Lunch/Dinner/Snacks)")
         if st.button("💾 Save Food Listing"):
-            if not f_name:
-                st.error("Food_Name is required.")
+            f_row = {"Food_ID": f_id or None, "Food_Name": f_name or None, "Quantity": int(f_qty),
+                     "Expiry_Date": f_exp.isoformat(), "Provider_ID": f_pid or None}
+            problems = form_errors("food_listings", f_row)
+            if problems:
+                st.error("Not saved: " + "; ".join(problems))
             else:
                 if f_id == 0:
                     exec_sql(
-                        """INSERT INTO food_listings
-                           (Food_Name, Quantity, Expiry_Date, Provider_ID, Provider_Type, Location, Food_Type, Meal_Type)
-                           VALUES (?,?,?,?,?,?,?,?)""",
+                        WRITE_QUERIES["insert food listing"],
                         (f_name, int(f_qty), f_exp.isoformat(), f_pid if f_pid > 0 else None,
                          f_ptype, f_loc, f_ftype, f_meal),
                     )
                 else:
                     exec_sql(
-                        """INSERT INTO food_listings
-                           (Food_ID, Food_Name, Quantity, Expiry_Date, Provider_ID, Provider_Type, Location, Food_Type, Meal_Type)
-                           VALUES (?,?,?,?,?,?,?,?,?)
-                           ON CONFLICT(Food_ID) DO UPDATE SET
-                             Food_Name=excluded.Food_Name,
-                             Quantity=excluded.Quantity,
-                             Expiry_Date=excluded.Expiry_Date,
-                             Provider_ID=excluded.Provider_ID,
-                             Provider_Type=excluded.Provider_Type,
-                             Location=excluded.Location,
-                             Food_Type=excluded.Food_Type,
-                             Meal_Type=excluded.Meal_Type""",
+                        WRITE_QUERIES["upsert food listing"],
                         (f_id, f_name, int(f_qty), f_exp.isoformat(), f_pid if f_pid > 0 else None,
                          f_ptype, f_loc, f_ftype, f_meal),
                     )
-                cache_bust()
                 st.success("Food listing saved.")
     with col2:
         del_fid = st.number_input("Food_ID to delete", min_value=0, step=1, key="delf")
         if st.button("🗑️ Delete Food Listing"):
             if del_fid > 0:
-                exec_sql("DELETE FROM food_listings WHERE Food_ID = ?", (del_fid,))
-                cache_bust()
-                st.success(f"Food listing {del_fid} deleted.")
+                delete_row(WRITE_QUERIES["delete food listing"], del_fid, "Food listing")
             else:
                 st.error("Enter a valid Food_ID.")
 
     st.markdown("**Food Listings**")
-    st.dataframe(view_df.sort_values("Food_ID"), use_container_width=True)
+    st.dataframe(table_page("food_listings", search, "fs"), use_container_width=True)
 
 # ---------- Claims CRUD ----------
-with tabs[4]:
+def render_claims():
     st.subheader("📦 Claims (CRUD)")
     search = st.text_input("Search claims by status / timestamp / IDs", key="cs")
-    base_df = table_df("claims")
-    if search:
-        s = search.lower()
-        mask = (
-            base_df["Status"].astype(str).str.lower().str.contains(s) |
-            base_df["Timestamp"].astype(str).str.lower().str.contains(s) |
-            base_df["Claim_ID"].astype(str).str.contains(s) |
-            base_df["Food_ID"].astype(str).str.contains(s) |
-            base_df["Receiver_ID"].astype(str).str.contains(s)
-        )
-        view_df = base_df[mask]
-    else:
-        view_df = base_df
 
     col1, col2 = st.columns(2)
     with col1:
         c_id = st.number_input("Claim_ID (0 to auto)", min_value=0, step=1)
         c_food = st.number_input("Food_ID (must exist)", min_value=0, step=1)
         c_recv = st.number_input("Receiver_ID (must exist)", min_value=0, step=1)
-        c_status = st.selectbox("Status", ["Pending", "Completed", "Cancelled"])
+        c_status = st.selectbox("Status", validate.ENUMS["claims", "Status"])
         c_ts = st.text_input("Timestamp (auto if blank, ISO 8601)", value="")
         if st.button("💾 Save Claim"):
-            ts_val = c_ts.strip() or datetime.now().isoformat(timespec="seconds")
-            if c_id == 0:
-                exec_sql(
-                    "INSERT INTO claims(Food_ID, Receiver_ID, Status, Timestamp) VALUES (?,?,?,?)",
-                    (c_food if c_food > 0 else None, c_recv if c_recv > 0 else None, c_status, ts_val)
-                )
+            ts_val = iso_timestamp(c_ts.strip() or datetime.now())
+            problems = form_errors("claims", {"Claim_ID": c_id or None, "Food_ID": c_food or None,
+                                              "Receiver_ID": c_recv or None, "Status": c_status})
+            if parse_datetime(ts_val) is None:
+                st.error("Timestamp must be ISO 8601 (YYYY-MM-DD HH:MM:SS) or M/D/YYYY H:MM.")
+            elif problems:
+                st.error("Not saved: " + "; ".join(problems))
             else:
-                exec_sql(
-                    """INSERT INTO claims(Claim_ID, Food_ID, Receiver_ID, Status, Timestamp)
-                       VALUES (?,?,?,?,?)
-                       ON CONFLICT(Claim_ID) DO UPDATE SET
-                         Food_ID=excluded.Food_ID,
-                         Receiver_ID=excluded.Receiver_ID,
-                         Status=excluded.Status,
-                         Timestamp=excluded.Timestamp""",
-                    (c_id, c_food if c_food > 0 else None, c_recv if c_recv > 0 else None, c_status, ts_val)
-                )
-            cache_bust()
-            st.success("Claim saved.")
+                if c_id == 0:
+                    exec_sql(
+                        WRITE_QUERIES["insert claim"],
+                        (c_food if c_food > 0 else None, c_recv if c_recv > 0 else None, c_status, ts_val)
+                    )
+                else:
+                    exec_sql(
+                        WRITE_QUERIES["upsert claim"],
+                        (c_id, c_food if c_food > 0 else None, c_recv if c_recv > 0 else None, c_status, ts_val)
+                    )
+                st.success("Claim saved.")
     with col2:
         del_cid = st.number_input("Claim_ID to delete", min_value=0, step=1, key="delc")
         if st.button("🗑️ Delete Claim"):
             if del_cid > 0:
-                exec_sql("DELETE FROM claims WHERE Claim_ID = ?", (del_cid,))
-                cache_bust()
-                st.success(f"Claim {del_cid} deleted.")
+                delete_row(WRITE_QUERIES["delete claim"], del_cid, "Claim", missing="not found or archived")
             else:
                 st.error("Enter a valid Claim_ID.")
 
     st.markdown("**Claims**")
-    st.dataframe(view_df.sort_values("Claim_ID"), use_container_width=True)
+    st.caption(f"Completed and cancelled claims older than {archive.ARCHIVE_AFTER_DAYS} days are archived: "
+               "they still count on the dashboard, but are not listed here and are read-only.")
+    st.dataframe(table_page("claims", search, "cs"), use_container_width=True)
+
+    st.markdown("**Suggested listings**")
+    m_col1, m_col2 = st.columns(2)
+    with m_col1:
+        m_recv = st.number_input("Receiver_ID", min_value=0, step=1, key="match_recv")
+        m_n = st.number_input("Suggestions", min_value=1, max_value=50, value=5, step=1, key="match_n")
+        if st.button("🔍 Suggest Listings"):
+            picks = match_index().best_for(int(m_recv), int(m_n))
+            if picks:
+                st.dataframe(pd.DataFrame(picks), use_container_width=True)
+            else:
+                st.info("No open listings in this receiver's city.")
+    with m_col2:
+        st.caption("Pair every receiver without an active claim with the soonest-expiring open listing in their city.")
+        if st.button("🧮 Preview Assignments"):
+            st.session_state["assignments"] = match_index().assign_pending()
+        assignments = st.session_state.get("assignments")
+        if assignments:
+            st.dataframe(pd.DataFrame(assignments), use_container_width=True)
+            if st.button(f"✅ Create {len(assignments)} Pending Claims"):
+                ts_val = iso_timestamp(datetime.now())
+                # Submitted together so the writer commits them as one batch
+                futures = [
+                    writer.submit(WRITE_QUERIES["insert claim"], (a["Food_ID"], a["Receiver_ID"], "Pending", ts_val),
+                                  DB_PATH, on_commit=after_commit)
+                    for a in assignments
+                ]
+                failed = [f.exception(writer.WRITE_TIMEOUT) for f in futures]
+                failed = [e for e in failed if e is not None]
+                st.session_state.pop("assignments")
+                st.success(f"{len(assignments) - len(failed)} claims created.")
+                if failed:
+                    st.error(f"{len(failed)} claims failed: {failed[0]}")
+        elif assignments is not None:
+            st.info("No receivers to assign.")
+
+VIEWS = dict(zip(VIEW_NAMES, [render_dashboard, render_providers, render_receivers,
+                              render_food_listings, render_claims]))
+
+with perf.timed(f"view {view}"), perf.source(view):
+    VIEWS[view]()
+perf.record_rerun(view, _RUN_STARTED)
@@ -0,0 +1 @@
+"""Benchmarks for the dashboard workload (see bench/run.py)."""
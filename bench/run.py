@@ -0,0 +1,186 @@
+"""Dashboard workload benchmark.
+
+Generates synthetic data at the requested scale, loads it with the streaming
+loader, then times every named query (SQL_QUERIES, AGG_QUERIES,
+CHART_QUERIES), the CRUD tab paging/search and expiry queries, and the CRUD
+writes in WRITE_QUERIES. Results are written as JSON; pass --compare to
+diff against an earlier run and fail on regressions.
+
+    python -m bench.run --rows 100000 --out bench_results.json
+    python -m bench.run --rows 100000 --compare bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from bench.synth import generate
+from scripts import db
+from scripts.create_tables import TABLE_KEYS
+from scripts.expiry import expiring_query
+from scripts.load_data import load_csv
+from scripts.paging import count_query, page_query
+from scripts.queries import AGG_QUERIES, CHART_QUERIES, SQL_QUERIES, WRITE_QUERIES
+
+REPEAT = 5
+WRITE_OPS = 200
+REGRESSION_THRESHOLD = 0.25  # 25% slower than the baseline
+
+def _stats(samples):
+    ordered = sorted(samples)
+    return {
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+    }
+
+def time_query(conn, sql, params=(), repeat=REPEAT):
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(conn.execute(sql, params).fetchall())
+        samples.append(time.perf_counter() - started)
+    return dict(_stats(samples), rows=rows)
+
+def read_workload(sizes, city):
+    work = {}
+    for name, sql in SQL_QUERIES.items():
+        work[f"sql: {name}"] = (sql, (city,) * sql.count("?"))
+    for name, sql in AGG_QUERIES.items():
+        work[f"aggregate: {name}"] = (sql, ())
+    for name, sql in CHART_QUERIES.items():
+        work[f"chart: {name}"] = (sql, ())
+    for table in TABLE_KEYS:
+        last_page = max(1, sizes[table] // 50)
+        work[f"page: {table} first"] = page_query(table)
+        work[f"page: {table} last"] = page_query(table, page=last_page)
+        work[f"page: {table} count"] = count_query(table)
+    for table, term in [("providers", "store"), ("receivers", "ngo"),
+                        ("food_listings", "rice"), ("claims", "pend")]:
+        work[f"search: {table} '{term}'"] = page_query(table, term)
+        work[f"search: {table} '{term}' count"] = count_query(table, term)
+    work["expiry: 3 days"] = expiring_query(days=3)
+    work["expiry: 3 days in city"] = expiring_query(days=3, city=city)
+    return work
+
+def write_params(kind, table, i, sizes):
+    today = date.today()
+    base = sizes[table] + 1_000_000 + i
+    if kind == "delete":
+        return (base,)
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    values = {
+        "providers": (f"Bench {i}", "Restaurant", "1 Bench Road", "Benchville", "555-0000"),
+        "receivers": (f"Bench {i}", "NGO", "Benchville", "555-0000"),
+        "food_listings": (f"Bench {i}", 10, (today + timedelta(days=2)).isoformat(), 1,
+                          "Restaurant", "Benchville", "Vegetarian", "Lunch"),
+        "claims": (1, 1, "Pending", ts),
+    }[table]
+    return (base,) + values if kind == "upsert" else values
+
+def time_writes(conn, sizes, ops=WRITE_OPS):
+    results = {}
+    names = {"providers": "provider", "receivers": "receiver",
+             "food_listings": "food listing", "claims": "claim"}
+    for table, noun in names.items():
+        for kind in ("insert", "upsert", "delete"):
+            sql = WRITE_QUERIES[f"{kind} {noun}"]
+            samples = []
+            for i in range(ops):
+                params = write_params(kind, table, i, sizes)
+                started = time.perf_counter()
+                conn.execute(sql, params)
+                conn.commit()
+                samples.append(time.perf_counter() - started)
+            results[f"write: {kind} {noun}"] = dict(_stats(samples), ops=ops)
+    return results
+
+def run(rows, workdir, repeat=REPEAT, write_ops=WRITE_OPS, seed=42):
+    report = {
+        "meta": {
+            "rows": rows,
+            "seed": seed,
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "generate": {},
+        "load": {},
+        "timings": {},
+    }
+    started = time.perf_counter()
+    paths, sizes = generate(os.path.join(workdir, "csv"), rows=rows, seed=seed)
+    report["generate"] = {"seconds": round(time.perf_counter() - started, 3), "sizes": sizes}
+
+    db_path = os.path.join(workdir, "bench.db")
+    with db.connection(db_path) as conn:
+        for table in TABLE_KEYS:
+            report["load"][table] = load_csv(conn, table, paths[table], mode="replace")
+        conn.execute("ANALYZE")
+        conn.commit()
+        city = conn.execute(
+            "SELECT City FROM providers GROUP BY City ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()[0]
+        for name, (sql, params) in read_workload(sizes, city).items():
+            report["timings"][name] = time_query(conn, sql, params, repeat)
+        report["timings"].update(time_writes(conn, sizes, write_ops))
+    return report
+
+def compare(report, baseline, threshold=REGRESSION_THRESHOLD):
+    regressions = []
+    for name, current in report["timings"].items():
+        before = baseline.get("timings", {}).get(name)
+        if not before or not before["median_ms"]:
+            continue
+        change = current["median_ms"] / before["median_ms"] - 1
+        if change > threshold:
+            regressions.append((name, before["median_ms"], current["median_ms"], change))
+    for name, was, now, change in sorted(regressions, key=lambda r: -r[3]):
+        print(f"REGRESSION {name}: {was:.3f} ms -> {now:.3f} ms (+{change:.0%})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000, help="rows per table (10k to 10M)")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--workdir", help="where CSVs and the database go (default: temp dir)")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--write-ops", type=int, default=WRITE_OPS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        report = run(args.rows, args.workdir, args.repeat, args.write_ops, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            report = run(args.rows, workdir, args.repeat, args.write_ops, args.seed)
+            db.close_all()
+
+    for name, t in report["timings"].items():
+        print(f"{name:<70} {t['median_ms']:>10.3f} ms")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    if baseline is not None and compare(report, baseline, args.threshold):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
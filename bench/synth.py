@@ -0,0 +1,125 @@
+"""Synthetic data generator for the dashboard benchmark.
+
+Writes providers/receivers/food_listings/claims CSVs in the same column
+layout as data/*_data.csv. Categorical values (cities, provider and receiver
+types, food names and types, meal types, claim statuses) are drawn with the
+frequencies observed in the sample CSVs; rows are streamed to disk so any
+scale fits in constant memory.
+"""
+import csv
+import os
+import random
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+SAMPLE_DIR = "data"
+CHUNK_ROWS = 50_000
+
+COLUMNS = {
+    "providers": ["Provider_ID", "Name", "Type", "Address", "City", "Contact"],
+    "receivers": ["Receiver_ID", "Name", "Type", "City", "Contact"],
+    "food_listings": ["Food_ID", "Food_Name", "Quantity", "Expiry_Date", "Provider_ID",
+                      "Provider_Type", "Location", "Food_Type", "Meal_Type"],
+    "claims": ["Claim_ID", "Food_ID", "Receiver_ID", "Status", "Timestamp"],
+}
+
+# Rows per table relative to --rows (the sample CSVs are 1:1:1:1)
+RATIOS = {"providers": 1.0, "receivers": 1.0, "food_listings": 1.0, "claims": 1.0}
+
+class Distribution:
+    def __init__(self, counter):
+        self.values = list(counter)
+        self.weights = list(counter.values())
+
+    def sample(self, rng, k):
+        return rng.choices(self.values, weights=self.weights, k=k)
+
+def sample_distributions(sample_dir=SAMPLE_DIR):
+    counters = {}
+    wanted = {
+        "providers": ["Type", "City"],
+        "receivers": ["Type", "City"],
+        "food_listings": ["Food_Name", "Food_Type", "Meal_Type", "Quantity"],
+        "claims": ["Status"],
+    }
+    for table, cols in wanted.items():
+        with open(os.path.join(sample_dir, f"{table}_data.csv"), newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                for col in cols:
+                    counters.setdefault((table, col), Counter())[row[col]] += 1
+    return {key: Distribution(c) for key, c in counters.items()}
+
+def table_sizes(rows):
+    return {table: max(1, int(rows * ratio)) for table, ratio in RATIOS.items()}
+
+def _chunks(total):
+    start = 1
+    while start <= total:
+        n = min(CHUNK_ROWS, total - start + 1)
+        yield start, n
+        start += n
+
+def _write(path, columns, row_chunks):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in row_chunks:
+            writer.writerows(rows)
+
+def generate(out_dir, rows=10_000, seed=42, sample_dir=SAMPLE_DIR, today=None):
+    rng = random.Random(seed)
+    dist = sample_distributions(sample_dir)
+    sizes = table_sizes(rows)
+    today = today or date.today()
+    os.makedirs(out_dir, exist_ok=True)
+    # Providers and receivers share the sample's city pool, so per-city groups grow with scale.
+    # Provider types are kept as one byte per provider for the listings' Provider_Type.
+    type_pool = dist[("providers", "Type")].values
+    provider_types = bytearray(sizes["providers"] + 1)
+
+    def providers():
+        for start, n in _chunks(sizes["providers"]):
+            types = dist[("providers", "Type")].sample(rng, n)
+            cities = dist[("providers", "City")].sample(rng, n)
+            for i, t in zip(range(start, start + n), types):
+                provider_types[i] = type_pool.index(t)
+            yield [[i, f"Provider {i}", t, f"{i} Market Street", c, f"555-{i % 10000:04d}"]
+                   for i, t, c in zip(range(start, start + n), types, cities)]
+
+    def receivers():
+        for start, n in _chunks(sizes["receivers"]):
+            types = dist[("receivers", "Type")].sample(rng, n)
+            cities = dist[("receivers", "City")].sample(rng, n)
+            yield [[i, f"Receiver {i}", t, c, f"555-{i % 10000:04d}"]
+                   for i, t, c in zip(range(start, start + n), types, cities)]
+
+    def food_listings():
+        for start, n in _chunks(sizes["food_listings"]):
+            names = dist[("food_listings", "Food_Name")].sample(rng, n)
+            ftypes = dist[("food_listings", "Food_Type")].sample(rng, n)
+            meals = dist[("food_listings", "Meal_Type")].sample(rng, n)
+            qtys = dist[("food_listings", "Quantity")].sample(rng, n)
+            cities = dist[("providers", "City")].sample(rng, n)
+            rows_out = []
+            for k, i in enumerate(range(start, start + n)):
+                pid = rng.randint(1, sizes["providers"])
+                expiry = today + timedelta(days=rng.randint(-30, 30))
+                rows_out.append([i, names[k], qtys[k], expiry.isoformat(), pid,
+                                 type_pool[provider_types[pid]], cities[k], ftypes[k], meals[k]])
+            yield rows_out
+
+    def claims():
+        start_ts = datetime.combine(today, datetime.min.time()) - timedelta(days=90)
+        for start, n in _chunks(sizes["claims"]):
+            statuses = dist[("claims", "Status")].sample(rng, n)
+            yield [[i, rng.randint(1, sizes["food_listings"]), rng.randint(1, sizes["receivers"]), s,
+                    (start_ts + timedelta(minutes=rng.randint(0, 90 * 24 * 60))).strftime("%Y-%m-%d %H:%M:%S")]
+                   for i, s in zip(range(start, start + n), statuses)]
+
+    generators = {"providers": providers, "receivers": receivers,
+                  "food_listings": food_listings, "claims": claims}
+    paths = {}
+    for table, gen in generators.items():
+        paths[table] = os.path.join(out_dir, f"{table}_data.csv")
+        _write(paths[table], COLUMNS[table], gen())
+    return paths, sizes
@@ -0,0 +1,87 @@
+"""Incrementally maintained dashboard aggregates.
+
+Counts per city / type / status (and a few sums) live in one small
+`aggregates` table. Triggers on the base tables apply +/- deltas on every
+INSERT, UPDATE (including ON CONFLICT upserts) and DELETE, so dashboard reads
+cost O(groups) instead of O(rows). NULL group keys are stored as ''. Deletes
+made under scripts/guard.py (claim archival) leave the counts alone.
+"""
+from scripts.guard import GUARDED
+
+AGGREGATES_DDL = """
+CREATE TABLE IF NOT EXISTS aggregates (
+    Metric TEXT NOT NULL,
+    Key TEXT NOT NULL,
+    Value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (Metric, Key)
+) WITHOUT ROWID;
+"""
+
+# metric -> (table, group key expression, value expression, row condition)
+# Expressions use {r}. as the row prefix (NEW./OLD. in triggers, nothing in rebuilds)
+METRICS = {
+    "providers_city":       ("providers", "{r}City", "1", "1"),
+    "providers_type":       ("providers", "{r}Type", "1", "1"),
+    "receivers_city":       ("receivers", "{r}City", "1", "1"),
+    "food_location":        ("food_listings", "{r}Location", "1", "1"),
+    "food_type":            ("food_listings", "{r}Food_Type", "1", "1"),
+    "food_meal":            ("food_listings", "{r}Meal_Type", "1", "1"),
+    "food_quantity":        ("food_listings", "''", "IFNULL({r}Quantity, 0)", "1"),
+    "claims_status":        ("claims", "{r}Status", "1", "1"),
+    "claims_completed_day": ("claims", "date({r}Timestamp)", "1",
+                             "{r}Status = 'Completed' AND date({r}Timestamp) IS NOT NULL"),
+}
+
+def _delta(metric, row, sign):
+    _, key, value, cond = METRICS[metric]
+    key, value, cond = (e.format(r=row) for e in (key, value, cond))
+    # The WHERE clause is required: it disambiguates ON CONFLICT after INSERT ... SELECT
+    return (
+        f"INSERT INTO aggregates (Metric, Key, Value) "
+        f"SELECT '{metric}', IFNULL({key}, ''), {sign}({value}) WHERE {cond} "
+        f"ON CONFLICT(Metric, Key) DO UPDATE SET Value = Value + excluded.Value;"
+    )
+
+def trigger_sql(table):
+    metrics = [m for m, spec in METRICS.items() if spec[0] == table]
+    inserts = "\n".join(_delta(m, "NEW.", "+") for m in metrics)
+    deletes = "\n".join(_delta(m, "OLD.", "-") for m in metrics)
+    return [
+        f"CREATE TRIGGER agg_{table}_ins AFTER INSERT ON {table} BEGIN\n{inserts}\nEND",
+        f"CREATE TRIGGER agg_{table}_del AFTER DELETE ON {table} WHEN {GUARDED} BEGIN\n{deletes}\nEND",
+        f"CREATE TRIGGER agg_{table}_upd AFTER UPDATE ON {table} BEGIN\n{deletes}\n{inserts}\nEND",
+    ]
+
+def history_source(conn, table):
+    # Archived claims still count (scripts/archive.py): read them through claims_all
+    view = f"{table}_all"
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='view' AND name=?", (view,)).fetchone()
+    return view if exists else table
+
+def rebuild_aggregates(conn):
+    cur = conn.cursor()
+    cur.execute("DELETE FROM aggregates")
+    for metric, (table, key, value, cond) in METRICS.items():
+        key, value, cond = (e.format(r="") for e in (key, value, cond))
+        cur.execute(
+            f"INSERT INTO aggregates (Metric, Key, Value) "
+            f"SELECT '{metric}', IFNULL({key}, ''), SUM({value}) FROM {history_source(conn, table)} "
+            f"WHERE {cond} GROUP BY IFNULL({key}, '')"
+        )
+    conn.commit()
+
+def create_aggregates(conn, rebuild=False):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='aggregates'"
+    ).fetchone()
+    cur = conn.cursor()
+    cur.execute(AGGREGATES_DDL)
+    # Recreated on every schema init so trigger bodies follow METRICS
+    for table in sorted({spec[0] for spec in METRICS.values()}):
+        for event in ("ins", "del", "upd"):
+            cur.execute(f"DROP TRIGGER IF EXISTS agg_{table}_{event}")
+        for stmt in trigger_sql(table):
+            cur.execute(stmt)
+    conn.commit()
+    if rebuild or not exists:
+        rebuild_aggregates(conn)
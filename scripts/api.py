@@ -0,0 +1,321 @@
+"""Headless HTTP/JSON API for partner apps.
+
+    python -m scripts.api --db db/food_wastage.db --port 8765
+
+  GET  /health
+  GET  /listings?search=&page=&page_size=&after=   food listing search, paged
+  GET  /analytics                                  the SQL_QUERIES outputs
+  GET  /analytics/<name>?city=                     one output (URL-encoded name)
+  GET  /series?dim=&key=&start=&end=&grain=&metrics=   rollup time series
+  POST /claims   {"Food_ID", "Receiver_ID", "Status"?, "Timestamp"?}
+
+One asyncio event loop serves HTTP/1.1 with keep-alive. Reads use the same
+paging and named queries as app.py and go through QUERY_CACHE, which here
+holds the encoded JSON rows, so a cache hit never leaves the event loop.
+Misses run on a small thread pool over db.connection(). Claims are validated
+with scripts/validate.py and committed by the single writer thread.
+
+Writes from other processes (the Streamlit app, the CSV loader) reach the
+cache through the change log. Every CHANGE_POLL seconds, the tables with
+changelog rows past the last Seq seen are bumped (changelog.ChangeWatcher).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from scripts import db, rollups, validate, writer
+from scripts.cache import QUERY_CACHE, written_tables
+from scripts.changelog import ChangeWatcher
+from scripts.dates import iso_timestamp, parse_datetime
+from scripts.paging import MAX_PAGE_SIZE, PAGE_SIZE, count_query, page_query
+from scripts.queries import AGG_QUERIES, SQL_QUERIES, WRITE_QUERIES
+
+READ_WORKERS = 4
+CHANGE_POLL = 0.5          # seconds between change log checks
+KEEPALIVE_TIMEOUT = 15     # seconds an idle connection is kept open
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+MAX_PAGE = 1_000_000       # deeper pages are an OFFSET scan; page with `after` instead
+MAX_KEY = 2**63 - 1        # SQLite INTEGER range
+
+# POST /claims fields: (name, accepted JSON types, description)
+CLAIM_FIELDS = [("Food_ID", int, "an integer"), ("Receiver_ID", int, "an integer"),
+                ("Status", str, "a string"), ("Timestamp", str, "a string")]
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+log = logging.getLogger("food_wastage.api")
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _int(query, name, default=None, low=0, high=MAX_KEY):
+    value = query.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer") from None
+    if not low <= value <= high:
+        # Past the INTEGER range sqlite3 raises OverflowError on binding
+        raise HTTPError(400, f"{name} must be between {low} and {high}")
+    return value
+
+def _params(sql):
+    # Outputs with a placeholder take the sidebar city filter in app.py
+    return ["city"] if "?" in sql else []
+
+def response(status, payload, keep_alive=True):
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + payload
+
+class API:
+    def __init__(self, db_path=db.DB_PATH, workers=READ_WORKERS):
+        db.ensure_schema(db_path)
+        self.db_path = db_path
+        self.stats = {"connections": 0, "requests": 0, "errors": 0}
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="api-read")
+        self._changes = ChangeWatcher(CHANGE_POLL)
+        self._polling = None  # future of the change log read in flight
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/listings"): self.listings,
+            ("GET", "/analytics"): self.analytics_index,
+            ("GET", "/series"): self.series,
+            ("POST", "/claims"): self.create_claim,
+        }
+
+    # ---------- reads ----------
+    def _load(self, query, params):
+        with db.connection(self.db_path) as conn:
+            cur = conn.execute(query, params or ())
+            columns = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+        db.count_query()
+        return json.dumps([dict(zip(columns, row)) for row in rows], default=str).encode()
+
+    def _sync_changes(self):
+        with db.connection(self.db_path) as conn:
+            changed = self._changes.poll(conn, writer.get_writer(self.db_path).logged_since)
+        if changed:
+            QUERY_CACHE.bump(*changed)
+
+    async def _poll_changes(self):
+        if not self._changes.due():
+            return  # skip the thread pool hop between polls
+        # One change log read on the pool at a time; requests that arrive
+        # meanwhile wait for it rather than queueing their own
+        if self._polling is None or self._polling.done():
+            self._polling = asyncio.get_running_loop().run_in_executor(self._pool, self._sync_changes)
+        await asyncio.shield(self._polling)
+
+    def _load_series(self, query, params):
+        with db.connection(self.db_path) as conn:
+            rows = conn.execute(query, params).fetchall()
+        db.count_query()
+        grain, _, _, start, end = params
+        return json.dumps(rollups.shape(rows, grain, parse_datetime(start), parse_datetime(end))).encode()
+
+    async def read(self, query, params=None, load=None):
+        # Encoded JSON: an array of row objects unless `load` builds something else
+        await self._poll_changes()
+        hit, found = QUERY_CACHE.lookup(query, params)
+        if hit:
+            return found
+        body = await asyncio.get_running_loop().run_in_executor(self._pool, load or self._load, query, params)
+        QUERY_CACHE.store(found, body)
+        return body
+
+    # ---------- handlers: (query dict, body bytes) -> (status, payload bytes) ----------
+    async def health(self, query, body):
+        return 200, json.dumps(dict(self.stats, cache=QUERY_CACHE.info())).encode()
+
+    async def listings(self, query, body):
+        search = query.get("search", "")
+        page = _int(query, "page", 1, low=1, high=MAX_PAGE)
+        page_size = min(_int(query, "page_size", PAGE_SIZE, low=1), MAX_PAGE_SIZE)
+        sql, params = page_query("food_listings", search, page, page_size, after=_int(query, "after"))
+        rows, total = await asyncio.gather(self.read(sql, params),
+                                           self.read(*count_query("food_listings", search)))
+        meta = {"total": json.loads(total)[0]["total"], "page": page, "page_size": page_size}
+        return 200, json.dumps(meta).encode()[:-1] + b', "rows": ' + rows + b"}"
+
+    async def analytics_index(self, query, body):
+        outputs = [{"name": name, "params": _params(AGG_QUERIES.get(name, sql))} for name, sql in SQL_QUERIES.items()]
+        return 200, json.dumps({"outputs": outputs}).encode()
+
+    async def analytics(self, name, query):
+        if name not in SQL_QUERIES:
+            raise HTTPError(404, f"no analytics output named {name!r}")
+        sql = AGG_QUERIES.get(name, SQL_QUERIES[name])
+        params = None
+        if _params(sql):
+            city = query.get("city", "").strip()
+            if not city:
+                raise HTTPError(400, "city is required for this output")
+            params = (city,)
+        rows = await self.read(sql, params)
+        return 200, b'{"name": ' + json.dumps(name).encode() + b', "rows": ' + rows + b"}"
+
+    async def series(self, query, body):
+        # Chart-ready buckets and per-metric values (scripts/rollups.py)
+        start = parse_datetime(query.get("start"))
+        if start is None:
+            raise HTTPError(400, "start is required (ISO date)")
+        end = parse_datetime(query.get("end")) or datetime.now()
+        if query.get("key") is None:
+            raise HTTPError(400, "key is required (Provider_ID or city)")
+        metrics = [m for m in query.get("metrics", "").split(",") if m]
+        unknown = sorted(set(metrics) - set(rollups.METRICS))
+        if unknown:
+            raise HTTPError(400, f"unknown metrics {unknown}; choose from {rollups.METRICS}")
+        grain = query.get("grain") or rollups.grain_for(start)
+        try:
+            sql, params = rollups.series_query(query.get("dim", "city"), query["key"], grain, start, end)
+        except ValueError as e:
+            raise HTTPError(400, str(e)) from None
+        # Cached with every metric; a subset is cut out per request
+        payload = await self.read(sql, params, load=self._load_series)
+        if metrics:
+            data = json.loads(payload)
+            data["series"] = {m: data["series"][m] for m in metrics}
+            payload = json.dumps(data).encode()
+        return 200, payload
+
+    def _check_claim(self, row):
+        with db.connection(self.db_path) as conn:
+            return validate.check_row(conn, "claims", row, mode="append")
+
+    async def create_claim(self, query, body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "body must be JSON") from None
+        if not isinstance(data, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        problems = [f"{c}: required" for c in ("Food_ID", "Receiver_ID") if data.get(c) is None]
+        # JSON floats, lists and objects would reach sqlite3 as unbindable values
+        problems += [f"{c}: must be {kind}" for c, types, kind in CLAIM_FIELDS
+                     if data.get(c) is not None and (not isinstance(data[c], types) or isinstance(data[c], bool))]
+        if problems:
+            raise HTTPError(400, problems)
+        ts = iso_timestamp(data.get("Timestamp") or datetime.now())
+        if parse_datetime(ts) is None:
+            raise HTTPError(400, ["Timestamp: not a date"])
+        row = {"Food_ID": data["Food_ID"], "Receiver_ID": data["Receiver_ID"],
+               "Status": data.get("Status", "Pending")}
+        problems = await asyncio.get_running_loop().run_in_executor(self._pool, self._check_claim, row)
+        if problems:
+            raise HTTPError(400, problems)
+        future = writer.submit(WRITE_QUERIES["insert claim"], (*row.values(), ts), self.db_path,
+                               on_commit=lambda q, p, result: QUERY_CACHE.bump(*written_tables(q)))
+        try:
+            claim_id, _ = await asyncio.wrap_future(future)
+        except sqlite3.IntegrityError as e:
+            raise HTTPError(409, str(e)) from None  # a parent deleted since the check
+        return 201, json.dumps(dict(row, Claim_ID=claim_id, Timestamp=ts)).encode()
+
+    # ---------- HTTP ----------
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/") or "/"
+        self.stats["requests"] += 1
+        try:
+            if path.startswith("/analytics/"):
+                if method != "GET":
+                    raise HTTPError(405, f"{method} not allowed on {path}")
+                return await self.analytics(unquote(path[len("/analytics/"):]), query)
+            handler = self.routes.get((method, path))
+            if handler is None:
+                known = any(p == path for _, p in self.routes)
+                raise HTTPError(405 if known else 404, f"{method} {path} not found")
+            return await handler(query, body)
+        except HTTPError as e:
+            self.stats["errors"] += 1
+            return e.status, json.dumps({"error": e.args[0]}).encode()
+        except Exception:
+            self.stats["errors"] += 1
+            log.exception("%s %s failed", method, target)
+            return 500, b'{"error": "internal error"}'
+
+    async def handle(self, reader, out):
+        self.stats["connections"] += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    out.write(response(413, b'{"error": "headers too large"}', keep_alive=False))
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ")
+                except ValueError:
+                    out.write(response(400, b'{"error": "bad request line"}', keep_alive=False))
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    out.write(response(400, b'{"error": "bad Content-Length"}', keep_alive=False))
+                    break
+                if length > MAX_BODY_BYTES:
+                    out.write(response(413, b'{"error": "body too large"}', keep_alive=False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                status, payload = await self.dispatch(method, target, body)
+                out.write(response(status, payload, keep_alive))
+                await out.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            out.close()
+
+async def serve(db_path=db.DB_PATH, host="127.0.0.1", port=8765, workers=READ_WORKERS):
+    api = API(db_path, workers)
+    server = await asyncio.start_server(api.handle, host, port, limit=MAX_HEADER_BYTES)
+    print(f"Serving {db_path} on http://{host}:{port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=READ_WORKERS, help="threads for cache misses")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Monthly archive partitions for closed claims.
+
+`claims` is the hot partition. Completed and Cancelled claims older than
+ARCHIVE_AFTER_DAYS are moved, in batches, into one table per month
+(claims_YYYY_MM, same columns and key), so the Claims tab, status filters
+and expiry probes only touch recent rows. Two views cover the history:
+
+  claims_all   - every claim row, hot and archived (UNION ALL of partitions)
+  claim_facts  - (Food_ID, Receiver_ID, Status, Claims): one row per hot
+                 claim plus the pre-aggregated claims_rollup counts of
+                 archived ones. SQL_QUERIES count claims with SUM(Claims)
+                 over this view, so the dashboard stays correct without
+                 reading the archive tables.
+
+Expiry and matching still read `claims` only. They look for completed
+claims on listings that have not expired yet and for pending claims, and
+neither is archived in practice.
+
+The move runs under scripts/guard.py, so the aggregates table (dashboard
+charts) keeps counting archived claims and the change log does not report
+them as deleted.
+
+Claim IDs are never reused. `claims` declares Claim_ID AUTOINCREMENT, and
+reserve_ids() keeps its sqlite_sequence entry at or above the highest
+archived ID, so moving the newest claims out cannot hand their IDs to new
+rows. claims_archived lists the archived keys; scripts/validate.py rejects
+writes that would bring one of them back into `claims`.
+
+    python -m scripts.archive --db db/food_wastage.db --days 90
+"""
+import argparse
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from scripts.dates import ISO_TIMESTAMP
+from scripts.guard import triggers_suppressed
+
+ARCHIVE_AFTER_DAYS = 90
+ARCHIVED_STATUSES = ("Completed", "Cancelled")
+BATCH_ROWS = 5_000
+ARCHIVE_INTERVAL = 6 * 3600  # seconds between scheduled runs
+
+PARTITION = re.compile(r"^claims_(\d{4})_(\d{2})$")
+
+log = logging.getLogger("food_wastage.archive")
+
+ROLLUP_DDL = """
+CREATE TABLE IF NOT EXISTS claims_rollup (
+    Food_ID INTEGER NOT NULL,
+    Receiver_ID INTEGER NOT NULL,
+    Status TEXT NOT NULL,
+    Claims INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (Food_ID, Receiver_ID, Status)
+) WITHOUT ROWID;
+"""
+
+def partition_name(month):
+    # month is 'YYYY-MM'
+    return "claims_" + month.replace("-", "_")
+
+def partitions(conn):
+    names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    return sorted(n for n in names if PARTITION.match(n))
+
+def _claims_columns(conn):
+    return [(row[1], row[2], row[5]) for row in conn.execute("PRAGMA table_info(claims)")]
+
+def _foreign_keys(conn, table):
+    return [f"FOREIGN KEY ({row[3]}) REFERENCES {row[2]}({row[4]})"
+            for row in conn.execute(f"PRAGMA foreign_key_list({table})")]
+
+def create_partition(conn, name):
+    # Same columns, key and FOREIGN KEY clauses as claims; the IDs come from
+    # claims, so the partition key needs no AUTOINCREMENT of its own
+    cols = [f"{c} {t}{' PRIMARY KEY' if pk else ''}" for c, t, pk in _claims_columns(conn)]
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(cols + _foreign_keys(conn, 'claims'))})")
+    # Listing edits re-attribute their claims' rollups (scripts/rollups.py)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_food ON {name}(Food_ID)")
+
+def repair_partitions(conn):
+    # Partitions created before they carried the FOREIGN KEY clauses
+    repaired = []
+    for name in partitions(conn):
+        if _foreign_keys(conn, name) or not _foreign_keys(conn, "claims"):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_food ON {name}(Food_ID)")
+            continue
+        conn.execute(f"ALTER TABLE {name} RENAME TO {name}_legacy")
+        create_partition(conn, name)
+        conn.execute(f"INSERT INTO {name} SELECT * FROM {name}_legacy")
+        conn.execute(f"DROP TABLE {name}_legacy")
+        repaired.append(name)
+    return repaired
+
+def reserve_ids(conn):
+    # New claims get IDs above every archived one (AUTOINCREMENT never goes
+    # below sqlite_sequence)
+    top = max((conn.execute(f"SELECT MAX(Claim_ID) FROM {name}").fetchone()[0] or 0
+               for name in partitions(conn)), default=0)
+    if not conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'claims'", (top,)).rowcount:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('claims', ?)", (top,))
+
+def refresh_views(conn):
+    columns = ", ".join(c for c, _, _ in _claims_columns(conn))
+    parts = [f"SELECT {columns} FROM {t}" for t in ["claims"] + partitions(conn)]
+    conn.execute("DROP VIEW IF EXISTS claims_all")
+    conn.execute(f"CREATE VIEW claims_all AS {' UNION ALL '.join(parts)}")
+    archived = [f"SELECT Claim_ID FROM {t}" for t in partitions(conn)] or ["SELECT NULL AS Claim_ID WHERE 0"]
+    conn.execute("DROP VIEW IF EXISTS claims_archived")
+    conn.execute(f"CREATE VIEW claims_archived AS {' UNION ALL '.join(archived)}")
+    conn.execute("DROP VIEW IF EXISTS claim_facts")
+    conn.execute(
+        """CREATE VIEW claim_facts AS
+           SELECT Food_ID, Receiver_ID, Status, 1 AS Claims FROM claims
+           UNION ALL
+           SELECT NULLIF(Food_ID, 0), NULLIF(Receiver_ID, 0), NULLIF(Status, ''), Claims FROM claims_rollup"""
+    )
+
+def create_archive(conn):
+    conn.execute(ROLLUP_DDL)
+    repair_partitions(conn)
+    refresh_views(conn)
+    reserve_ids(conn)
+    conn.commit()
+
+def clear_archive(conn):
+    # Before a replace-mode reload of claims, which brings its own history.
+    # Returns the number of archived claims dropped; the caller commits.
+    dropped = 0
+    for name in partitions(conn):
+        dropped += conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+        conn.execute(f"DROP TABLE {name}")
+    conn.execute("DELETE FROM claims_rollup")
+    refresh_views(conn)
+    return dropped
+
+def _move_batch(conn, cutoff, month, batch_rows):
+    marks = ",".join("?" * len(ARCHIVED_STATUSES))
+    ids = [row[0] for row in conn.execute(
+        f"SELECT Claim_ID FROM claims WHERE Timestamp >= ? AND Timestamp < ? AND Status IN ({marks}) "
+        f"ORDER BY Timestamp LIMIT ?",
+        (f"{month}-01", min(cutoff, _next_month(month)), *ARCHIVED_STATUSES, batch_rows),
+    )]
+    if not ids:
+        return 0
+    id_marks = ",".join("?" * len(ids))
+    with triggers_suppressed(conn, "archive"):
+        conn.execute(f"INSERT OR REPLACE INTO {partition_name(month)} SELECT * FROM claims WHERE Claim_ID IN ({id_marks})", ids)
+        conn.execute(
+            f"""INSERT INTO claims_rollup (Food_ID, Receiver_ID, Status, Claims)
+                SELECT IFNULL(Food_ID, 0), IFNULL(Receiver_ID, 0), IFNULL(Status, ''), COUNT(*)
+                FROM claims WHERE Claim_ID IN ({id_marks})
+                GROUP BY IFNULL(Food_ID, 0), IFNULL(Receiver_ID, 0), IFNULL(Status, '')
+                ON CONFLICT(Food_ID, Receiver_ID, Status) DO UPDATE SET Claims = Claims + excluded.Claims""",
+            ids,
+        )
+        conn.execute(f"DELETE FROM claims WHERE Claim_ID IN ({id_marks})", ids)
+    conn.commit()
+    return len(ids)
+
+def _next_month(month):
+    year, mon = map(int, month.split("-"))
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}-01"
+
+def archive_closed(conn, older_than_days=ARCHIVE_AFTER_DAYS, now=None, batch_rows=BATCH_ROWS):
+    # Returns {partition: claims moved}
+    cutoff = ((now or datetime.now()) - timedelta(days=older_than_days)).strftime(ISO_TIMESTAMP)
+    marks = ",".join("?" * len(ARCHIVED_STATUSES))
+    months = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT substr(Timestamp, 1, 7) FROM claims "
+        f"WHERE Timestamp < ? AND Status IN ({marks}) ORDER BY 1",
+        (cutoff, *ARCHIVED_STATUSES),
+    ) if row[0] and re.match(r"^\d{4}-\d{2}$", row[0])]
+    moved = {}
+    for month in months:
+        name = partition_name(month)
+        if name not in partitions(conn):
+            create_partition(conn, name)
+            refresh_views(conn)
+            conn.commit()
+        total = 0
+        while True:
+            n = _move_batch(conn, cutoff, month, batch_rows)
+            total += n
+            if n < batch_rows:
+                break
+        if total:
+            moved[name] = total
+    return moved
+
+_scheduled = set()
+_scheduled_lock = threading.Lock()
+
+def start_scheduler(db_path, interval=ARCHIVE_INTERVAL, older_than_days=ARCHIVE_AFTER_DAYS, on_archived=None):
+    # One background archiver per database file per process
+    with _scheduled_lock:
+        if db_path in _scheduled:
+            return
+        _scheduled.add(db_path)
+
+    # Imported here: scripts.db imports the schema modules, this one included
+    from scripts import db
+
+    def loop():
+        while True:
+            # The first run waits an interval too, so it never races page
+            # loads for the lock while the app starts up
+            time.sleep(interval)
+            try:
+                with db.connection(db_path) as conn:  # pooled: shared PRAGMAS and busy timeout
+                    moved = archive_closed(conn, older_than_days)
+                if moved and on_archived is not None:
+                    on_archived(moved)
+            except sqlite3.Error:
+                log.exception("Claim archival failed; retrying in %ss", interval)
+
+    threading.Thread(target=loop, name=f"claims-archiver:{db_path}", daemon=True).start()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="db/food_wastage.db")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive closed claims older than this")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    started = time.perf_counter()
+    moved = archive_closed(conn, args.days, batch_rows=args.batch_rows)
+    conn.close()
+    for name, n in moved.items():
+        print(f"{name}: {n} claims archived")
+    print(f"{sum(moved.values())} claims archived in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
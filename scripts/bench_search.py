@@ -0,0 +1,60 @@
+"""Benchmark: pandas substring masks vs the FTS5 search indexes.
+
+Times the search the CRUD tabs used to run (load the table, then
+.astype(str).str.lower().str.contains over the search columns) against the
+count + first-page queries from scripts/paging.py.
+
+    python -m scripts.bench_search --db db/food_wastage.db --terms new rice ve
+"""
+import argparse
+import sqlite3
+import time
+
+import pandas as pd
+
+from scripts.paging import count_query, page_query
+from scripts.search import FTS_COLUMNS
+
+def _timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+def pandas_search(conn, table, term):
+    df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+    s = term.lower()
+    mask = False
+    for col in FTS_COLUMNS[table][1]:
+        mask = mask | df[col].astype(str).str.lower().str.contains(s, regex=False)
+    return int(mask.sum())
+
+def fts_search(conn, table, term):
+    sql, params = count_query(table, term)
+    total = conn.execute(sql, params).fetchone()[0]
+    sql, params = page_query(table, term)
+    conn.execute(sql, params).fetchall()
+    return total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="db/food_wastage.db")
+    parser.add_argument("--terms", nargs="+", default=["new", "rice", "store", "ve", "n"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    print(f"{'table':<15} {'term':<10} {'pandas ms':>10} {'fts ms':>8} {'speedup':>8}  matches")
+    for table in FTS_COLUMNS:
+        for term in args.terms:
+            pd_ms, pd_hits = _timed(lambda: pandas_search(conn, table, term), args.repeat)
+            fts_ms, fts_hits = _timed(lambda: fts_search(conn, table, term), args.repeat)
+            speedup = pd_ms / fts_ms if fts_ms else float("inf")
+            print(f"{table:<15} {term:<10} {pd_ms:>10.2f} {fts_ms:>8.2f} {speedup:>7.1f}x  {pd_hits}/{fts_hits}")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Process-wide query result cache with per-table invalidation.
+
+Each entry remembers the tables its query reads and their version numbers at
+load time. Write paths call bump() for the tables they touched; entries whose
+tables moved on are reloaded on their next lookup, everything else keeps
+hitting. Entry count and estimated size are bounded with LRU eviction.
+"""
+import re
+import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from scripts.aggregates import METRICS
+from scripts.search import fts_tables
+
+MAX_ENTRIES = 256
+MAX_BYTES = 64 * 1024 * 1024
+
+# Tables refreshed by triggers (and the archive views) when a base table
+# changes. Queries that pick aggregates by Metric are tracked against the
+# metric's base table instead.
+DERIVED = {
+    "providers": ("aggregates", *fts_tables("providers")),
+    "receivers": ("aggregates", *fts_tables("receivers")),
+    "food_listings": ("aggregates", "expiry_buckets", "rollups", *fts_tables("food_listings")),
+    "claims": ("aggregates", "claim_facts", "claims_all", "claims_rollup", "rollups"),
+}
+
+_READ_REF = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+_METRIC_REF = re.compile(r"\bMetric\s*=\s*'(\w+)'")
+_WRITE_REF = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+([A-Za-z_]\w*)",
+    re.IGNORECASE,
+)
+
+@lru_cache(maxsize=1024)
+def read_tables(query):
+    tables = {t.lower() for t in _READ_REF.findall(query)}
+    metrics = _METRIC_REF.findall(query)
+    if "aggregates" in tables and metrics and all(m in METRICS for m in metrics):
+        tables.discard("aggregates")
+        tables.update(METRICS[m][0] for m in metrics)
+    return frozenset(tables)
+
+@lru_cache(maxsize=1024)
+def written_tables(query):
+    return frozenset(t.lower() for t in _WRITE_REF.findall(query))
+
+def _size_of(value):
+    try:
+        return int(value.memory_usage(deep=True).sum())
+    except AttributeError:
+        return sys.getsizeof(value)
+
+class QueryCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.versions = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+        self._entries = OrderedDict()  # key -> (value, tables, versions, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _snapshot(self, tables):
+        return tuple(self.versions.get(t, 0) for t in sorted(tables))
+
+    def bump(self, *tables):
+        with self._lock:
+            for table in tables:
+                table = table.lower()
+                for t in (table,) + DERIVED.get(table, ()):
+                    self.versions[t] = self.versions.get(t, 0) + 1
+
+    def lookup(self, query, params):
+        # (True, value) on a hit; (False, token) on a miss, to pass to store()
+        key = (query, tuple(params) if params else None)
+        tables = read_tables(query)
+        with self._lock:
+            hit = self._entries.get(key)
+            snapshot = self._snapshot(tables)
+            if hit is not None:
+                if hit[2] == snapshot:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return True, hit[0]
+                self._drop(key)
+                self.stats["invalidations"] += 1
+            self.stats["misses"] += 1
+        return False, (key, tables, snapshot)
+
+    def store(self, token, value):
+        # A bump during the load leaves this entry stale under the old
+        # snapshot, so the next lookup reloads it.
+        key, tables, snapshot = token
+        size = _size_of(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, tables, snapshot, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self._bytes > self.max_bytes and len(self._entries) > 1
+            ):
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def get_or_load(self, query, params, loader):
+        hit, found = self.lookup(query, params)
+        if hit:
+            return found
+        # Load outside the lock
+        value = loader(query, params)
+        self.store(found, value)
+        return value
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), bytes=self._bytes)
+
+QUERY_CACHE = QueryCache()
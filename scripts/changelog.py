@@ -0,0 +1,126 @@
+"""Append-only change log (CDC) for the four base tables.
+
+Triggers append one row to `changelog` per inserted, updated (including
+ON CONFLICT upserts) or deleted row, with the row's new values as JSON, so
+every write path is captured: exec_sql, the CSV loader, migrations. Seq is an
+AUTOINCREMENT key, so it only ever grows and is never reused after pruning.
+
+A replace-mode reload logs a single 'T' (truncate) entry instead of one
+delete per existing row; rows inserted by the reload are logged as usual.
+scripts/export_changes.py streams the log since a given Seq. Claim archival
+deletes under scripts/guard.py, so moved claims are not logged as deleted.
+
+ChangeWatcher turns the log into cache invalidation across processes: the
+dashboard and the API each poll it for tables written by someone else.
+"""
+import threading
+import time
+
+from scripts.guard import GUARDED
+
+CHANGELOG_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS changelog (
+        Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        Tbl TEXT NOT NULL,
+        Op TEXT NOT NULL CHECK (Op IN ('I', 'U', 'D', 'T')),
+        Row_ID INTEGER,
+        Row TEXT,
+        Changed_At TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_changelog_table ON changelog(Tbl, Seq)",
+]
+
+EVENTS = ("ins", "upd", "del")
+
+def _columns(conn, table):
+    info = list(conn.execute(f"PRAGMA table_info({table})"))
+    pk = next(row[1] for row in info if row[5])
+    return [row[1] for row in info], pk
+
+def _log(table, op, row, pk, columns):
+    values = "NULL" if row == "OLD" else "json_object(" + ", ".join(f"'{c}', NEW.{c}" for c in columns) + ")"
+    return (f"INSERT INTO changelog (Tbl, Op, Row_ID, Row) "
+            f"VALUES ('{table}', '{op}', {row}.{pk}, {values});")
+
+def trigger_sql(conn, table):
+    columns, pk = _columns(conn, table)
+    return {
+        f"cdc_{table}_ins": f"AFTER INSERT ON {table} BEGIN {_log(table, 'I', 'NEW', pk, columns)} END",
+        # A key change is a delete of the old row plus the new row's state
+        f"cdc_{table}_upd": (
+            f"AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO changelog (Tbl, Op, Row_ID) SELECT '{table}', 'D', OLD.{pk} WHERE OLD.{pk} IS NOT NEW.{pk}; "
+            f"{_log(table, 'U', 'NEW', pk, columns)} END"
+        ),
+        f"cdc_{table}_del": f"AFTER DELETE ON {table} WHEN {GUARDED} BEGIN {_log(table, 'D', 'OLD', pk, columns)} END",
+    }
+
+def drop_change_triggers(conn, table):
+    for event in EVENTS:
+        conn.execute(f"DROP TRIGGER IF EXISTS cdc_{table}_{event}")
+
+def create_change_triggers(conn, table):
+    drop_change_triggers(conn, table)
+    for name, body in trigger_sql(conn, table).items():
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+
+def log_truncate(conn, table):
+    conn.execute("INSERT INTO changelog (Tbl, Op) VALUES (?, 'T')", (table,))
+
+def create_changelog(conn, tables):
+    for stmt in CHANGELOG_DDL:
+        conn.execute(stmt)
+    # Recreated on every schema init so trigger bodies follow the table columns
+    for table in tables:
+        create_change_triggers(conn, table)
+    conn.commit()
+
+def current_seq(conn):
+    return conn.execute("SELECT IFNULL(MAX(Seq), 0) FROM changelog").fetchone()[0]
+
+class ChangeWatcher:
+    # poll() returns the tables with changelog rows past the last Seq seen,
+    # skipping the Seq ranges this process logged itself (writer.logged_since),
+    # whose caches were already updated on commit. The first poll only records
+    # where the log stands.
+    def __init__(self, interval=0.0):
+        self.interval = interval
+        self._seq = None
+        self._polled = 0.0
+        self._lock = threading.Lock()
+
+    def due(self):
+        return time.monotonic() - self._polled >= self.interval
+
+    def poll(self, conn, own=None):
+        with self._lock:
+            if not self.due():
+                return set()
+            self._polled = time.monotonic()
+            if self._seq is None:
+                self._seq = current_seq(conn)
+                return set()
+            ranges = own(self._seq) if own is not None else []
+            skip = "".join(" AND NOT (Seq > ? AND Seq <= ?)" for _ in ranges)
+            changed = conn.execute(
+                f"SELECT Tbl, MAX(Seq) FROM changelog WHERE Seq > ?{skip} GROUP BY Tbl",
+                (self._seq, *(seq for r in ranges for seq in r)),
+            ).fetchall()
+            self._seq = max([self._seq, *(seq for _, seq in changed), *(hi for _, hi in ranges)])
+        return {table for table, _ in changed}
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+def watcher(db_path):
+    # One per database file per process, like writer.get_writer
+    with _watchers_lock:
+        return _watchers.setdefault(db_path, ChangeWatcher())
+
+def prune_changelog(conn, through_seq):
+    # Once every consumer has synced past through_seq
+    cur = conn.execute("DELETE FROM changelog WHERE Seq <= ?", (through_seq,))
+    conn.commit()
+    return cur.rowcount
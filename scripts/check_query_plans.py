@@ -0,0 +1,79 @@
+"""Query-plan regression check for the dashboard queries.
+
+Runs EXPLAIN QUERY PLAN for every entry in SQL_QUERIES, AGG_QUERIES and
+CHART_QUERIES and exits non-zero if any of them scans a table without an index.
+Scans of a materialized view (claim_facts) are fine as long as the view's own
+subqueries use indexes; claims_rollup is pre-aggregated, so scanning it is too.
+
+    python -m scripts.check_query_plans            # fresh in-memory schema
+    python -m scripts.check_query_plans --db db/food_wastage.db
+"""
+import argparse
+import re
+import sqlite3
+import sys
+
+from scripts.create_tables import create_schema
+from scripts.queries import AGG_QUERIES, CHART_QUERIES, SQL_QUERIES
+
+# "SCAN claims" or "SCAN c" without "USING ... INDEX" is a full table scan
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+PRE_AGGREGATED = {"claims_rollup"}
+
+def all_queries():
+    for name, query in SQL_QUERIES.items():
+        yield name, query
+    for name, query in AGG_QUERIES.items():
+        yield f"aggregate: {name}", query
+    for name, query in CHART_QUERIES.items():
+        yield f"chart: {name}", query
+
+def query_plan(conn, query):
+    params = ("x",) * query.count("?")
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+def view_names(conn, query):
+    # The views a query reads, under their own names and their aliases
+    views = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'view'")]
+    names = set()
+    for view in views:
+        for match in re.finditer(rf"\b{view}\b(?:\s+(?:AS\s+)?(\w+))?", query, re.IGNORECASE):
+            names.add(view)
+            if match.group(1) and match.group(1).upper() not in {"JOIN", "WHERE", "GROUP", "ON", "ORDER"}:
+                names.add(match.group(1))
+    return names
+
+def full_scans(plan, allowed=()):
+    return [step for step in plan
+            if (m := FULL_SCAN.match(step.strip())) and m.group(1) not in allowed]
+
+def check(conn, verbose=False):
+    failures = {}
+    for name, query in all_queries():
+        plan = query_plan(conn, query)
+        bad = full_scans(plan, PRE_AGGREGATED | view_names(conn, query))
+        if bad:
+            failures[name] = plan
+        if verbose or bad:
+            print(("FAIL " if bad else "ok   ") + name)
+            for step in plan:
+                print("       " + step)
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=":memory:", help="database to check (default: fresh schema)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    create_schema(conn)
+    failures = check(conn, args.verbose)
+    conn.close()
+
+    total = len(SQL_QUERIES) + len(AGG_QUERIES) + len(CHART_QUERIES)
+    print(f"{total - len(failures)}/{total} queries use indexes.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,21 @@
+import os
 import sqlite3
+import sys
+
+if __package__ in (None, ""):  # run as `python scripts/create_tables.py`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.aggregates import create_aggregates
+from scripts.archive import create_archive
+from scripts.changelog import create_changelog
+from scripts.expiry import create_expiry
+from scripts.guard import create_guard
+from scripts.migrate_dates import migrate_dates
+from scripts.rollups import create_rollups
+from scripts.search import create_fts
+
+# PRAGMA user_version at which stored dates were normalized to ISO text
+DATES_VERSION = 1
 
 DDL = [
     """
@@ -36,7 +53,7 @@ DDL = [
     """,
     """
     CREATE TABLE IF NOT EXISTS claims (
-        Claim_ID INTEGER PRIMARY KEY,
+        Claim_ID INTEGER PRIMARY KEY AUTOINCREMENT,  -- never reused once archived
         Food_ID INTEGER,
         Receiver_ID INTEGER,
         Status TEXT CHECK(Status IN ('Pending','Completed','Cancelled')),
@@ -47,12 +64,105 @@ DDL = [
     """
 ]
 
-def create_tables(db_path="db/food_wastage.db"):
-    conn = sqlite3.connect(db_path)
+# Primary key of each table, in load (parent-before-child) order
+TABLE_KEYS = {
+    "providers": "Provider_ID",
+    "receivers": "Receiver_ID",
+    "food_listings": "Food_ID",
+    "claims": "Claim_ID",
+}
+
+# Secondary indexes backing SQL_QUERIES and the dashboard charts.
+# scripts/check_query_plans.py fails if any of those queries falls back to
+# a full table scan, so keep the two in step.
+INDEXES = [
+    # City lookups + per-city counts; covers "Provider contacts by city"
+    "CREATE INDEX IF NOT EXISTS idx_providers_city ON providers(City, Name, Type, Contact)",
+    "CREATE INDEX IF NOT EXISTS idx_providers_type ON providers(Type)",
+    "CREATE INDEX IF NOT EXISTS idx_providers_name ON providers(Name)",
+    "CREATE INDEX IF NOT EXISTS idx_receivers_city ON receivers(City)",
+    "CREATE INDEX IF NOT EXISTS idx_receivers_name ON receivers(Name)",
+    "CREATE INDEX IF NOT EXISTS idx_food_provider ON food_listings(Provider_ID, Quantity)",
+    "CREATE INDEX IF NOT EXISTS idx_food_location ON food_listings(Location)",
+    "CREATE INDEX IF NOT EXISTS idx_food_type ON food_listings(Food_Type)",
+    "CREATE INDEX IF NOT EXISTS idx_food_meal ON food_listings(Meal_Type)",
+    "CREATE INDEX IF NOT EXISTS idx_food_quantity ON food_listings(Quantity)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_food ON claims(Food_ID)",
+    # Covers the claim_facts view (scripts/archive.py) behind the claim counts
+    "CREATE INDEX IF NOT EXISTS idx_claims_receiver_status ON claims(Receiver_ID, Food_ID, Status)",
+    # Status filters, status joins on Food_ID and "has a completed claim?" probes
+    "CREATE INDEX IF NOT EXISTS idx_claims_status_food ON claims(Status, Food_ID, Timestamp)",
+    # ISO-text dates, so ranges are index range scans
+    "CREATE INDEX IF NOT EXISTS idx_claims_timestamp ON claims(Timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_food_expiry ON food_listings(Expiry_Date)",
+    # "Already claimed?" checks on a listing
+    "CREATE INDEX IF NOT EXISTS idx_claims_completed ON claims(Food_ID) WHERE Status = 'Completed'",
+]
+
+# Superseded indexes, dropped from existing databases
+DROPPED_INDEXES = [
+    "idx_claims_status",  # (Status, Timestamp, Food_ID): Food_ID unusable for probes
+    "idx_claims_receiver",  # (Receiver_ID, Food_ID): superseded by idx_claims_receiver_status
+]
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def _outdated(conn, table, stmt, info):
+    # No primary key, or a key declared before it took AUTOINCREMENT
+    if not any(row[5] for row in info):
+        return True
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()[0]
+    return "AUTOINCREMENT" in stmt and "AUTOINCREMENT" not in sql.upper()
+
+def repair_schema(conn):
+    # Older loaders used DataFrame.to_sql(if_exists="replace"), which drops the
+    # table and recreates it without keys or constraints. Rebuild such tables
+    # from DDL and copy their rows across.
+    repaired = []
+    cur = conn.cursor()
+    # Keep FOREIGN KEY clauses in other tables pointing at the original name
+    cur.execute("PRAGMA legacy_alter_table=ON")
+    for table, stmt in zip(TABLE_KEYS, DDL):
+        info = list(cur.execute(f"PRAGMA table_info({table})"))
+        if not info or not _outdated(conn, table, stmt, info):
+            continue
+        cur.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        cur.execute(stmt)
+        cols = [c for c in table_columns(conn, table) if c in {row[1] for row in info}]
+        col_list = ", ".join(cols)
+        cur.execute(f"INSERT OR IGNORE INTO {table} ({col_list}) SELECT {col_list} FROM {table}_legacy")
+        cur.execute(f"DROP TABLE {table}_legacy")
+        repaired.append(table)
+    conn.commit()
+    cur.execute("PRAGMA legacy_alter_table=OFF")
+    return repaired
+
+def create_schema(conn):
+    repaired = repair_schema(conn)
     cur = conn.cursor()
     for stmt in DDL:
         cur.execute(stmt)
+    for name in DROPPED_INDEXES:
+        cur.execute(f"DROP INDEX IF EXISTS {name}")
+    for stmt in INDEXES:
+        cur.execute(stmt)
     conn.commit()
+    create_guard(conn)
+    create_aggregates(conn, rebuild=bool(repaired))
+    create_fts(conn, rebuild=repaired)
+    create_expiry(conn, rebuild="food_listings" in repaired)
+    create_changelog(conn, TABLE_KEYS)
+    create_archive(conn)
+    create_rollups(conn, rebuild=bool(repaired))  # after the archive: rebuilds read claims_all
+    if conn.execute("PRAGMA user_version").fetchone()[0] < DATES_VERSION:
+        migrate_dates(conn)
+        conn.execute(f"PRAGMA user_version = {DATES_VERSION}")
+        conn.commit()
+
+def create_tables(db_path="db/food_wastage.db"):
+    conn = sqlite3.connect(db_path)
+    create_schema(conn)
     conn.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,66 @@
+"""Canonical text formats for dates stored in SQLite.
+
+Expiry dates are stored as 'YYYY-MM-DD' and claim timestamps as
+'YYYY-MM-DD HH:MM:SS', so they sort correctly as text, work with SQLite's
+date()/julianday() and can be range-scanned through an index. The sample CSVs
+use US-style values such as '3/17/2025' and '3/5/2025 5:26'.
+"""
+from datetime import datetime
+
+ISO_DATE = "%Y-%m-%d"
+ISO_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+
+# Non-ISO inputs accepted on load; ISO variants go through fromisoformat()
+US_FORMATS = ("%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y", "%m/%d/%y %H:%M", "%m/%d/%y")
+
+# (table, column) -> normalizer, applied by the loader, write paths and migration
+NORMALIZED_COLUMNS = {
+    ("food_listings", "Expiry_Date"): "iso_date",
+    ("claims", "Timestamp"): "iso_timestamp",
+}
+
+def parse_datetime(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in US_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+def iso_date(value):
+    # Unparseable values are returned unchanged rather than silently dropped
+    parsed = parse_datetime(value)
+    if parsed is None:
+        return None if value is None or str(value).strip() == "" else value
+    return parsed.strftime(ISO_DATE)
+
+def iso_timestamp(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        return None if value is None or str(value).strip() == "" else value
+    return parsed.strftime(ISO_TIMESTAMP)
+
+NORMALIZERS = {"iso_date": iso_date, "iso_timestamp": iso_timestamp}
+
+def register_functions(conn):
+    for name, fn in NORMALIZERS.items():
+        conn.create_function(name, 1, fn, deterministic=True)
+
+def normalizers_for(table, columns):
+    # {column index: normalizer} for the normalized columns present in `columns`
+    return {
+        i: NORMALIZERS[NORMALIZED_COLUMNS[(table, col)]]
+        for i, col in enumerate(columns)
+        if (table, col) in NORMALIZED_COLUMNS
+    }
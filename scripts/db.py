@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from scripts import perf
+from scripts.create_tables import create_schema
+
+DB_PATH = "db/food_wastage.db"
+
+# Applied to every pooled connection. WAL (set once per file by ensure_schema)
+# lets dashboard reads run while a CRUD save is committing; NORMAL sync is safe
+# under WAL and skips an fsync per commit.
+PRAGMAS = [
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",   # 256 MB
+    "PRAGMA cache_size=-65536",     # 64 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",       # off by default in SQLite; the DDL declares them
+]
+
+MAX_IDLE = 8  # idle connections kept per database file
+BUSY_TIMEOUT = 30  # seconds a connection waits for another writer's lock
+
+stats = {"opens": 0, "queries": 0, "schema_inits": 0}
+
+_lock = threading.Lock()
+_ready = set()
+_idle = {}
+
+def _open(db_path):
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    perf.trace(conn)
+    with _lock:
+        stats["opens"] += 1
+    return conn
+
+def ensure_schema(db_path=DB_PATH):
+    # Schema creation runs once per process and database file
+    with _lock:
+        if db_path in _ready:
+            return
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT)
+        # Persistent in the file. Switching needs the only lock on it, so it
+        # happens here, before any pooled connection or background thread
+        conn.execute("PRAGMA journal_mode=WAL")
+        create_schema(conn)
+        conn.close()
+        _ready.add(db_path)
+        stats["schema_inits"] += 1
+
+def acquire(db_path=DB_PATH):
+    ensure_schema(db_path)
+    with _lock:
+        pool = _idle.get(db_path)
+        if pool:
+            return pool.pop()
+    return _open(db_path)
+
+def release(conn, db_path=DB_PATH):
+    if conn.in_transaction:
+        conn.rollback()
+    with _lock:
+        pool = _idle.setdefault(db_path, [])
+        if len(pool) < MAX_IDLE:
+            pool.append(conn)
+            return
+    conn.close()
+
+@contextmanager
+def connection(db_path=DB_PATH):
+    # Streamlit starts a fresh thread for each rerun, so connections are
+    # checked out per call rather than pinned to thread-locals that would
+    # leak with every rerun. A connection is only used by one thread at a time.
+    conn = acquire(db_path)
+    try:
+        yield conn
+    finally:
+        release(conn, db_path)
+
+def count_query(n=1):
+    with _lock:
+        stats["queries"] += n
+
+def close_all():
+    with _lock:
+        pools = list(_idle.values())
+        _idle.clear()
+    for pool in pools:
+        for conn in pool:
+            conn.close()
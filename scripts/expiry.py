@@ -0,0 +1,103 @@
+"""Expiry alerts answered in SQL.
+
+"What expires in the next N days (or hours), in city X, with no completed
+claim yet" is an index range scan on (Location, Expiry_Date) / Expiry_Date
+plus a partial-index probe on completed claims. Per-day, per-city expiry
+totals are kept in the trigger-maintained expiry_buckets table for cheap
+headline numbers over any horizon.
+"""
+from datetime import datetime, timedelta
+
+EXPIRY_HORIZON_DAYS = 3
+MAX_HORIZON_DAYS = 365
+
+EXPIRY_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS expiry_buckets (
+        Day TEXT NOT NULL,
+        City TEXT NOT NULL,
+        Listings INTEGER NOT NULL DEFAULT 0,
+        Quantity INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (Day, City)
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_food_location_expiry ON food_listings(Location, Expiry_Date)",
+]
+
+def _delta(row, sign):
+    return (
+        f"INSERT INTO expiry_buckets (Day, City, Listings, Quantity) "
+        f"SELECT {row}.Expiry_Date, IFNULL({row}.Location, ''), {sign}1, {sign}IFNULL({row}.Quantity, 0) "
+        f"WHERE {row}.Expiry_Date IS NOT NULL "
+        f"ON CONFLICT(Day, City) DO UPDATE SET "
+        f"Listings = Listings + excluded.Listings, Quantity = Quantity + excluded.Quantity;"
+    )
+
+TRIGGERS = {
+    "expiry_food_ins": f"AFTER INSERT ON food_listings BEGIN {_delta('NEW', '+')} END",
+    "expiry_food_del": f"AFTER DELETE ON food_listings BEGIN {_delta('OLD', '-')} END",
+    "expiry_food_upd": f"AFTER UPDATE ON food_listings BEGIN {_delta('OLD', '-')} {_delta('NEW', '+')} END",
+}
+
+def rebuild_expiry_buckets(conn):
+    conn.execute("DELETE FROM expiry_buckets")
+    conn.execute(
+        """INSERT INTO expiry_buckets (Day, City, Listings, Quantity)
+           SELECT Expiry_Date, IFNULL(Location, ''), COUNT(*), SUM(IFNULL(Quantity, 0))
+           FROM food_listings WHERE Expiry_Date IS NOT NULL
+           GROUP BY Expiry_Date, IFNULL(Location, '')"""
+    )
+    conn.commit()
+
+def create_expiry(conn, rebuild=False):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='expiry_buckets'"
+    ).fetchone()
+    for stmt in EXPIRY_DDL:
+        conn.execute(stmt)
+    for name, body in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+    conn.commit()
+    if rebuild or not exists:
+        rebuild_expiry_buckets(conn)
+
+def horizon_window(days=None, hours=None, now=None):
+    # Expiry dates are day-granular, so an hour horizon covers every day it touches
+    now = now or datetime.now()
+    if hours is not None:
+        end = (now + timedelta(hours=hours)).date()
+    else:
+        days = EXPIRY_HORIZON_DAYS if days is None else days
+        end = now.date() + timedelta(days=min(int(days), MAX_HORIZON_DAYS))
+    return now.date().isoformat(), end.isoformat()
+
+def expiring_query(days=None, hours=None, city=None, limit=None, now=None):
+    start, end = horizon_window(days, hours, now)
+    sql = """SELECT f.*, CAST(julianday(f.Expiry_Date) - julianday(?) AS INTEGER) AS Days_To_Expiry
+             FROM food_listings f
+             WHERE f.Expiry_Date BETWEEN ? AND ?"""
+    params = [start, start, end]
+    if city:
+        sql += " AND f.Location = ?"
+        params.append(city)
+    sql += """
+               AND NOT EXISTS (SELECT 1 FROM claims c
+                               WHERE c.Food_ID = f.Food_ID AND c.Status = 'Completed')
+             ORDER BY f.Expiry_Date, f.Quantity DESC"""
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return sql, tuple(params)
+
+def bucket_summary_query(days=None, hours=None, city=None, now=None):
+    # Everything listed to expire in the window, claimed or not, per day
+    start, end = horizon_window(days, hours, now)
+    sql = """SELECT Day, SUM(Listings) AS listings, SUM(Quantity) AS quantity
+             FROM expiry_buckets WHERE Day BETWEEN ? AND ?"""
+    params = [start, end]
+    if city:
+        sql += " AND City = ?"
+        params.append(city)
+    sql += " GROUP BY Day ORDER BY Day"
+    return sql, tuple(params)
@@ -0,0 +1,136 @@
+"""Incremental export of the change log (scripts/changelog.py).
+
+--format csv writes, per table with changes after --since:
+  <table>_data.csv     latest state of every inserted/updated row, in the
+                       same column layout as data/<table>_data.csv
+  <table>_deleted.csv  primary keys of rows deleted since then
+A row changed several times appears once with its final state. If the table
+was reloaded (replace mode) in the window, the manifest marks it "truncated"
+and <table>_data.csv holds the rows loaded after that, so the consumer should
+replace its copy instead of merging.
+
+--format jsonl writes every change in Seq order, one JSON object per line.
+
+Both read only changelog rows after --since (an index range scan), so a sync
+costs O(changes), not O(table). changes_manifest.json records "until"; pass it
+as --since on the next run.
+
+    python -m scripts.export_changes --since 0 --out exports --tables claims
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+
+from scripts.changelog import current_seq
+from scripts.create_tables import TABLE_KEYS, table_columns
+
+FETCH_ROWS = 10_000
+MANIFEST = "changes_manifest.json"
+
+def _fetch(cur):
+    while True:
+        rows = cur.fetchmany(FETCH_ROWS)
+        if not rows:
+            return
+        yield from rows
+
+def iter_changes(conn, since, until, tables=None):
+    # (seq, table, op, row_id, row dict or None, changed_at) in Seq order
+    tables = list(tables or TABLE_KEYS)
+    marks = ",".join("?" * len(tables))
+    cur = conn.execute(
+        f"SELECT Seq, Tbl, Op, Row_ID, Row, Changed_At FROM changelog "
+        f"WHERE Seq > ? AND Seq <= ? AND Tbl IN ({marks}) ORDER BY Seq",
+        [since, until, *tables],
+    )
+    for seq, table, op, row_id, row, at in _fetch(cur):
+        yield seq, table, op, row_id, json.loads(row) if row else None, at
+
+def compacted_changes(conn, table, since, until):
+    # (truncated, iterator of (op, row_id, row dict or None)), one entry per row
+    truncated = conn.execute(
+        "SELECT MAX(Seq) FROM changelog WHERE Tbl = ? AND Op = 'T' AND Seq > ? AND Seq <= ?",
+        (table, since, until),
+    ).fetchone()[0]
+    # SQLite takes the bare columns from the row holding MAX(Seq): the last change
+    cur = conn.execute(
+        "SELECT Op, Row_ID, Row, MAX(Seq) FROM changelog "
+        "WHERE Tbl = ? AND Seq > ? AND Seq <= ? AND Op != 'T' GROUP BY Row_ID ORDER BY Row_ID",
+        (table, truncated or since, until),
+    )
+    return truncated is not None, ((op, row_id, json.loads(row) if row else None) for op, row_id, row, _ in _fetch(cur))
+
+def export_csv(conn, since, out_dir, tables=None, until=None):
+    os.makedirs(out_dir, exist_ok=True)
+    until = current_seq(conn) if until is None else until
+    manifest = {"since": since, "until": until, "format": "csv", "tables": {}}
+    for table in tables or TABLE_KEYS:
+        columns = table_columns(conn, table)
+        pk = TABLE_KEYS[table]
+        truncated, changes = compacted_changes(conn, table, since, until)
+        data_path = os.path.join(out_dir, f"{table}_data.csv")
+        deleted_path = os.path.join(out_dir, f"{table}_deleted.csv")
+        upserts = deletes = 0
+        with open(data_path, "w", newline="", encoding="utf-8") as data_f, \
+             open(deleted_path, "w", newline="", encoding="utf-8") as deleted_f:
+            data_w, deleted_w = csv.writer(data_f), csv.writer(deleted_f)
+            data_w.writerow(columns)
+            deleted_w.writerow([pk])
+            for op, row_id, row in changes:
+                if op == "D":
+                    deleted_w.writerow([row_id])
+                    deletes += 1
+                else:
+                    data_w.writerow([row.get(c) for c in columns])
+                    upserts += 1
+        if not (upserts or deletes or truncated):
+            os.remove(data_path)
+            os.remove(deleted_path)
+            continue
+        manifest["tables"][table] = {"upserts": upserts, "deletes": deletes, "truncated": truncated}
+    _write_manifest(out_dir, manifest)
+    return manifest
+
+def export_jsonl(conn, since, out_dir, tables=None, until=None):
+    os.makedirs(out_dir, exist_ok=True)
+    until = current_seq(conn) if until is None else until
+    counts = {}
+    with open(os.path.join(out_dir, "changes.jsonl"), "w", encoding="utf-8") as f:
+        for seq, table, op, row_id, row, at in iter_changes(conn, since, until, tables):
+            f.write(json.dumps({"seq": seq, "table": table, "op": op, "id": row_id,
+                                "row": row, "changed_at": at}) + "\n")
+            counts[table] = counts.get(table, 0) + 1
+    manifest = {"since": since, "until": until, "format": "jsonl", "tables": counts}
+    _write_manifest(out_dir, manifest)
+    return manifest
+
+def _write_manifest(out_dir, manifest):
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+EXPORTERS = {"csv": export_csv, "jsonl": export_jsonl}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="db/food_wastage.db")
+    parser.add_argument("--since", type=int, default=0, help="last Seq already synced")
+    parser.add_argument("--out", default="exports")
+    parser.add_argument("--format", choices=sorted(EXPORTERS), default="csv")
+    parser.add_argument("--tables", nargs="*", choices=list(TABLE_KEYS))
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    try:
+        conn.execute("BEGIN")  # one read snapshot for the whole export
+        manifest = EXPORTERS[args.format](conn, args.since, args.out, args.tables)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    for table, info in manifest["tables"].items():
+        print(f"{table}: {info}")
+    print(f"Exported changes {manifest['since'] + 1}..{manifest['until']}; next run: --since {manifest['until']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compact, typed DataFrames for query results.
+
+pd.read_sql_query hands back object columns of Python strings, one per cell,
+even for the handful of distinct cities, types and statuses. Results sit in
+the process-wide QUERY_CACHE, which is shared by every session, so compact()
+shrinks them before they are cached:
+
+- low-cardinality text columns become categoricals over one dictionary per
+  domain, shared by every frame and table (City and Location both use the
+  "city" dictionary), so the strings are held once per process and each
+  cell is a small integer code;
+- ID and quantity columns become nullable Int64 instead of float-with-NaN;
+- Expiry_Date and Timestamp are parsed into datetime64 from the ISO formats
+  in scripts/dates.py.
+"""
+import threading
+
+import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype
+
+from scripts.dates import ISO_DATE, ISO_TIMESTAMP
+
+# Result column -> shared dictionary
+CATEGORY_DOMAINS = {
+    "City": "city",
+    "Location": "city",
+    "Type": "type",
+    "Provider_Type": "type",
+    "Food_Type": "food_type",
+    "Meal_Type": "meal_type",
+    "Status": "status",
+}
+# Free text such as Name and Food_Name has about one distinct value per row; a
+# dictionary would only add codes on top of the strings, so it stays text
+INTEGER_COLUMNS = ("Provider_ID", "Receiver_ID", "Food_ID", "Claim_ID", "Quantity")
+DATETIME_COLUMNS = {"Expiry_Date": ISO_DATE, "Timestamp": ISO_TIMESTAMP}
+
+MAX_CATEGORIES = 10_000  # past this a domain is not low-cardinality; leave it as text
+
+_lock = threading.Lock()
+_dtypes = {}  # domain -> CategoricalDtype, only ever extended
+
+def category_dtype(domain, values):
+    # Grow the domain's dictionary with unseen values. Existing categories keep
+    # their positions, so frames built on an older dtype stay valid.
+    with _lock:
+        dtype = _dtypes.get(domain)
+        known = dtype.categories if dtype is not None else pd.Index([], dtype=object)
+        new = pd.Index(values).dropna().unique().difference(known)
+        if len(new) or dtype is None:
+            if len(known) + len(new) > MAX_CATEGORIES:
+                return None
+            dtype = _dtypes[domain] = pd.CategoricalDtype(known.append(new.sort_values()))
+        return dtype
+
+def _is_text(series):
+    # object before pandas 3, the str dtype from pandas 3 on
+    return is_object_dtype(series) or is_string_dtype(series)
+
+def compact(df):
+    for col in df.columns:
+        series = df[col]
+        if col in CATEGORY_DOMAINS and _is_text(series):
+            dtype = category_dtype(CATEGORY_DOMAINS[col], series)
+            if dtype is not None:
+                df[col] = series.astype(dtype)
+        elif col in INTEGER_COLUMNS and series.dtype.kind in "fO":
+            _convert(df, col, lambda s: pd.to_numeric(s, errors="coerce").astype("Int64"))
+        elif col in DATETIME_COLUMNS and _is_text(series):
+            _convert(df, col, lambda s: pd.to_datetime(s, format=DATETIME_COLUMNS[col], errors="coerce"))
+    return df
+
+def _convert(df, col, fn):
+    # Only when nothing is lost: legacy rows that never normalized stay visible as text
+    try:
+        converted = fn(df[col])
+    except (TypeError, ValueError):
+        return
+    if converted.isna().sum() == df[col].isna().sum():
+        df[col] = converted
+
+def dictionary_sizes():
+    with _lock:
+        return {domain: len(dtype.categories) for domain, dtype in _dtypes.items()}
@@ -0,0 +1,27 @@
+"""Switch for suppressing bookkeeping triggers during internal row moves.
+
+Delete triggers on the base tables (aggregates, change log) carry
+`WHEN {GUARDED}`. Archival moves rows out of `claims` without those claims
+ceasing to exist, so it deletes inside triggers_suppressed(). The guard row
+is inserted and removed inside the caller's transaction and is never
+committed, so other connections never see triggers switched off.
+"""
+from contextlib import contextmanager
+
+GUARD_DDL = "CREATE TABLE IF NOT EXISTS trigger_guard (Name TEXT PRIMARY KEY) WITHOUT ROWID"
+
+GUARDED = "NOT EXISTS (SELECT 1 FROM trigger_guard)"
+
+def create_guard(conn):
+    conn.execute(GUARD_DDL)
+    conn.execute("DELETE FROM trigger_guard")  # left over from a crashed process
+    conn.commit()
+
+@contextmanager
+def triggers_suppressed(conn, holder):
+    # The caller commits after the block, with the guard row already gone
+    conn.execute("INSERT OR REPLACE INTO trigger_guard (Name) VALUES (?)", (holder,))
+    try:
+        yield
+    finally:
+        conn.execute("DELETE FROM trigger_guard WHERE Name = ?", (holder,))
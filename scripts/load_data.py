@@ -1,23 +1,166 @@
+import argparse
+import csv
+import io
 import os
-import pandas as pd
-import sqlite3
-from create_tables import create_tables
-
-def load_all(
-    data_dir="C:/Users/HP/Desktop/Edureka/LocalFoodWastage/data",
-    db_path="C:/Users/HP/Desktop/Edureka/LocalFoodWastage/db/food_wastage.db"
-):
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    create_tables(db_path)
-    conn = sqlite3.connect(db_path)
-
-    pd.read_csv(f"{data_dir}/providers_data.csv").to_sql("providers", conn, if_exists="replace", index=False)
-    pd.read_csv(f"{data_dir}/receivers_data.csv").to_sql("receivers", conn, if_exists="replace", index=False)
-    pd.read_csv(f"{data_dir}/food_listings_data.csv").to_sql("food_listings", conn, if_exists="replace", index=False)
-    pd.read_csv(f"{data_dir}/claims_data.csv").to_sql("claims", conn, if_exists="replace", index=False)
-
-    conn.close()
+import sys
+import time
+from itertools import islice
+
+if __package__ in (None, ""):  # run as `python scripts/load_data.py`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import db, validate
+from scripts.aggregates import rebuild_aggregates
+from scripts.archive import clear_archive, partitions
+from scripts.rollups import rebuild_rollups
+from scripts.changelog import create_change_triggers, drop_change_triggers, log_truncate
+from scripts.create_tables import TABLE_KEYS, table_columns
+from scripts.dates import normalizers_for
+from scripts.search import FTS_COLUMNS, create_fts_triggers, drop_fts_triggers, rebuild_fts
+
+CHUNK_ROWS = 50_000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "data")
+DB_PATH = os.path.join(ROOT, "db", "food_wastage.db")
+
+# append  - plain INSERT; rows whose key already exists are rejected
+# upsert  - INSERT ... ON CONFLICT(<pk>) DO UPDATE
+# replace - empty the table, then insert (schema, constraints and indexes kept)
+MODES = ("append", "upsert", "replace")
+
+def insert_sql(table, columns, mode="append", select=None):
+    # VALUES for one row at a time, or `select` (validate.clean_select) for a batch
+    col_list = ", ".join(columns)
+    marks = ",".join("?" * len(columns))
+    sql = f"INSERT INTO {table} ({col_list}) " + (select or f"VALUES ({marks})")
+    pk = TABLE_KEYS[table]
+    updates = [c for c in columns if c != pk]
+    if mode == "upsert" and pk in columns and updates:
+        sets = ", ".join(f"{c}=excluded.{c}" for c in updates)
+        sql += f" ON CONFLICT({pk}) DO UPDATE SET {sets}"
+    return sql
+
+def _open_text(source):
+    # Accepts a path, a text stream, or a binary stream such as Streamlit's UploadedFile
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, newline="", encoding="utf-8-sig"), True
+    if isinstance(source, io.TextIOBase):
+        return source, False
+    return io.TextIOWrapper(source, encoding="utf-8-sig", newline=""), False
+
+def iter_chunks(reader, size):
+    while True:
+        chunk = list(islice(reader, size))
+        if not chunk:
+            return
+        yield chunk
+
+def load_csv(conn, table, source, mode="append", chunk_rows=CHUNK_ROWS):
+    if table not in TABLE_KEYS:
+        raise ValueError(f"Unknown table: {table}")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+
+    stream, owned = _open_text(source)
+    started = time.perf_counter()
+    rows = read = rejected = enforced = 0
+    report = []
+    # A full reload indexes far faster with one FTS rebuild at the end than
+    # with per-row sync triggers
+    bulk_fts = mode == "replace" and table in FTS_COLUMNS
+    try:
+        reader = csv.reader(stream)
+        header = next(reader, [])
+        known = set(table_columns(conn, table))
+        keep = [i for i, name in enumerate(header) if name in known]
+        columns = [header[i] for i in keep]
+        if not columns:
+            raise ValueError(f"No {table} columns found in CSV header: {header}")
+        normalize = normalizers_for(table, columns)
+        validate.create_stage(conn, table, columns)
+        sql = insert_sql(table, columns, mode, select=validate.clean_select(table, columns))
+
+        if mode == "replace":
+            # Children may still point at the rows being replaced; the new
+            # rows are checked against their parents and orphans are reported
+            conn.commit()
+            enforced = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+            conn.execute("PRAGMA foreign_keys=OFF")
+            if bulk_fts:
+                drop_fts_triggers(conn, table)
+            # One truncate record in the change log instead of a delete per row
+            drop_change_triggers(conn, table)
+            conn.execute(f"DELETE FROM {table}")
+            log_truncate(conn, table)
+            create_change_triggers(conn, table)
+        # Archived claims are dropped with the rest; their aggregate and
+        # rollup counts are rebuilt once the new rows are in
+        unarchived = clear_archive(conn) if mode == "replace" and table == "claims" else 0
+        for chunk in iter_chunks(reader, chunk_rows):
+            # Empty CSV cells become NULL rather than ''
+            batch = [[(rec[i] if i < len(rec) and rec[i] != "" else None) for i in keep] for rec in chunk]
+            for i, fn in normalize.items():
+                for values in batch:
+                    values[i] = fn(values[i])
+            validate.stage_rows(conn, table, columns, batch)
+            bad, lines = validate.check_stage(conn, table, columns, mode, first_row=read + 1)
+            rows += conn.execute(sql).rowcount
+            conn.commit()
+            read += len(batch)
+            rejected += bad
+            report.extend(lines[:validate.MAX_REPORT_ROWS - len(report)])
+        if unarchived:
+            rebuild_aggregates(conn)
+            rebuild_rollups(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if mode == "replace":
+            create_change_triggers(conn, table)  # the drop above is not undone by a rollback
+        if bulk_fts:
+            create_fts_triggers(conn, table)
+            rebuild_fts(conn, [table])
+        conn.execute(f"DROP TABLE IF EXISTS temp.{validate.stage_name(table)}")
+        conn.commit()
+        if mode == "replace" and enforced:
+            conn.execute("PRAGMA foreign_keys=ON")
+        if owned:
+            stream.close()
+        elif isinstance(stream, io.TextIOWrapper) and stream is not source:
+            stream.detach()
+
+    seconds = time.perf_counter() - started
+    return {
+        "table": table,
+        "rows": rows,
+        "rejected": rejected,
+        "report": report,  # (row, column, reason, value), first MAX_REPORT_ROWS
+        "orphaned": validate.orphaned(conn, table, [*TABLE_KEYS, *partitions(conn)]) if mode == "replace" else {},
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(read / seconds) if seconds else read,
+    }
+
+def load_all(data_dir=DATA_DIR, db_path=DB_PATH, mode="replace"):
+    results = []
+    with db.connection(db_path) as conn:
+        for table in TABLE_KEYS:
+            res = load_csv(conn, table, f"{data_dir}/{table}_data.csv", mode=mode)
+            print(f"{table}: {res['rows']} rows in {res['seconds']}s ({res['rows_per_sec']} rows/s), "
+                  f"{res['rejected']} rejected")
+            results.append(res)
+
     print("Loaded all CSVs.")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the four CSVs in <data>/<table>_data.csv into the database.")
+    parser.add_argument("--data", default=DATA_DIR, help="folder holding the CSVs")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--mode", choices=MODES, default="replace")
+    args = parser.parse_args(argv)
+    load_all(args.data, args.db, args.mode)
 
 if __name__ == "__main__":
-    load_all()
+    main()
@@ -0,0 +1,172 @@
+"""Load test for the HTTP/JSON API (scripts/api.py).
+
+Opens --connections keep-alive connections and sends requests back to back
+for --seconds. The request mix is listing pages, listing searches, analytics
+outputs and, for --write-ratio of requests, new claims. It reports
+requests/s, latency percentiles and the status codes returned.
+
+    python -m scripts.load_test_api --spawn --db db/food_wastage.db --seconds 10
+
+--spawn starts the server itself, pinned to one CPU where the OS allows it.
+Without it, point --url at a running instance. Claims use Food_ID/Receiver_ID
+values read from --db, so they pass validation.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+CONNECTIONS = 32
+SECONDS = 10
+WRITE_RATIO = 0.02
+SEARCH_TERMS = ["rice", "bread", "soup", "fruit", "veg", "chicken", "salad", "dairy", "pasta", "fish"]
+
+class Client:
+    # One keep-alive HTTP/1.1 connection
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+        )
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ")[1])
+        headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+        data = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+def sample_ids(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        foods = [r[0] for r in conn.execute("SELECT Food_ID FROM food_listings LIMIT 1000")]
+        receivers = [r[0] for r in conn.execute("SELECT Receiver_ID FROM receivers LIMIT 1000")]
+    finally:
+        conn.close()
+    return foods, receivers
+
+def make_request(rng, outputs, foods, receivers, write_ratio):
+    # (label, method, path, body)
+    if foods and receivers and rng.random() < write_ratio:
+        return "claim", "POST", "/claims", {"Food_ID": rng.choice(foods), "Receiver_ID": rng.choice(receivers)}
+    kind = rng.random()
+    if kind < 0.4:
+        return "listings page", "GET", f"/listings?page={rng.randint(1, 20)}", None
+    if kind < 0.7:
+        return "listings search", "GET", f"/listings?search={rng.choice(SEARCH_TERMS)}", None
+    return "analytics", "GET", f"/analytics/{quote(rng.choice(outputs), safe='')}", None
+
+async def run(url, connections=CONNECTIONS, seconds=SECONDS, write_ratio=WRITE_RATIO, db_path=None, seed=0):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    probe = Client(host, port)
+    _, index = await probe.request("GET", "/analytics")
+    probe.close()
+    # Outputs that need a city filter are left out of the mix
+    outputs = [o["name"] for o in json.loads(index)["outputs"] if not o["params"]]
+    foods, receivers = sample_ids(db_path) if db_path and write_ratio else ([], [])
+
+    latencies = {}
+    statuses = {}
+    deadline = time.perf_counter() + seconds
+
+    async def worker(n):
+        rng = random.Random(seed + n)
+        client = Client(host, port)
+        try:
+            while time.perf_counter() < deadline:
+                label, method, path, body = make_request(rng, outputs, foods, receivers, write_ratio)
+                started = time.perf_counter()
+                try:
+                    status, _ = await client.request(method, path, body)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    client.close()
+                    status = "connection error"
+                latencies.setdefault(label, []).append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    every = sorted(s for samples in latencies.values() for s in samples)
+    result = {
+        "requests": len(every),
+        "seconds": round(elapsed, 2),
+        "requests_per_sec": round(len(every) / elapsed),
+        "p50_ms": round(statistics.median(every) * 1000, 2) if every else None,
+        "p95_ms": round(every[int(len(every) * 0.95)] * 1000, 2) if every else None,
+        "p99_ms": round(every[int(len(every) * 0.99)] * 1000, 2) if every else None,
+        "statuses": statuses,
+    }
+    for label, samples in sorted(latencies.items()):
+        result[label] = f"{len(samples)} requests, p50 {statistics.median(samples) * 1000:.2f} ms"
+    return result
+
+def spawn(db_path, port):
+    proc = subprocess.Popen([sys.executable, "-m", "scripts.api", "--db", db_path, "--port", str(port)])
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(proc.pid, {sorted(os.sched_getaffinity(0))[0]})
+    return proc
+
+async def wait_ready(url, timeout=30):
+    parts = urlsplit(url)
+    end = time.perf_counter() + timeout
+    while True:
+        try:
+            client = Client(parts.hostname, parts.port or 80)
+            await client.request("GET", "/health")
+            client.close()
+            return
+        except OSError:
+            if time.perf_counter() > end:
+                raise
+            await asyncio.sleep(0.2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--db", default="db/food_wastage.db", help="database for --spawn and claim IDs")
+    parser.add_argument("--spawn", action="store_true", help="start a single-core server on --url's port")
+    parser.add_argument("--connections", type=int, default=CONNECTIONS)
+    parser.add_argument("--seconds", type=float, default=SECONDS)
+    parser.add_argument("--write-ratio", type=float, default=WRITE_RATIO)
+    args = parser.parse_args(argv)
+
+    proc = spawn(args.db, urlsplit(args.url).port or 80) if args.spawn else None
+    try:
+        asyncio.run(wait_ready(args.url))
+        result = asyncio.run(run(args.url, args.connections, args.seconds, args.write_ratio, args.db))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    for key, value in result.items():
+        print(f"{key:<18} {value}")
+    return 1 if any(s == "connection error" or (isinstance(s, int) and s >= 500) for s in result["statuses"]) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
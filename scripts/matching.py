@@ -0,0 +1,207 @@
+"""Claim matching: recommend open food listings to receivers.
+
+MatchIndex keeps every unexpired listing with Quantity > 0 in memory, bucketed
+by (Location, Food_Type, Meal_Type) and kept sorted by (expiry, largest
+quantity first). A listing is open while it has no Pending or Completed
+claim. best_for() merges the buckets of the receiver's city lazily, so a
+lookup touches only the first N open listings; assign_pending() hands out
+listings to every receiver without an active claim in one greedy pass.
+
+The index is loaded once per process and then updated from the CRUD writes
+(apply_write) instead of being rebuilt.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import date
+from itertools import islice
+
+from scripts.queries import WRITE_NAMES
+
+ACTIVE_STATUSES = ("Pending", "Completed")
+NO_EXPIRY = "9999-12-31"
+
+def _fold(value):
+    return (value or "").strip().casefold()
+
+class MatchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self._reset()
+
+    def _reset(self):
+        self._listings = {}       # Food_ID -> (bucket key, sort entry, row)
+        self._buckets = {}        # (city, food type, meal type) -> sorted [(expiry, -qty, Food_ID)]
+        self._city_keys = {}      # city -> {bucket key}
+        self._active = Counter()  # Food_ID -> active claim count
+        self._claims = {}         # Claim_ID -> (Food_ID, Receiver_ID) for active claims
+        self._receivers = {}      # Receiver_ID -> city
+        self._receiver_claims = Counter()
+
+    # ---------- loading ----------
+    def load(self, conn, today=None):
+        today = (today or date.today()).isoformat()
+        with self._lock:
+            self._reset()
+            for rid, city in conn.execute("SELECT Receiver_ID, City FROM receivers"):
+                self._receivers[rid] = _fold(city)
+            marks = ",".join("?" * len(ACTIVE_STATUSES))
+            for cid, fid, rid in conn.execute(
+                f"SELECT Claim_ID, Food_ID, Receiver_ID FROM claims WHERE Status IN ({marks})",
+                ACTIVE_STATUSES,
+            ):
+                self._claims[cid] = (fid, rid)
+                self._active[fid] += 1
+                self._receiver_claims[rid] += 1
+            for row in conn.execute(
+                """SELECT Food_ID, Food_Name, Quantity, Expiry_Date, Location, Food_Type, Meal_Type
+                   FROM food_listings
+                   WHERE Quantity > 0 AND (Expiry_Date IS NULL OR Expiry_Date >= ?)""",
+                (today,),
+            ):
+                self._add_listing(*row)
+            self.loaded = True
+
+    def ensure_loaded(self, conn):
+        with self._lock:
+            if not self.loaded:
+                self.load(conn)
+
+    def invalidate(self):
+        # Bulk changes (CSV loads): reload on next use
+        with self._lock:
+            self.loaded = False
+
+    # ---------- incremental maintenance ----------
+    def _add_listing(self, food_id, name, quantity, expiry, location, food_type, meal_type):
+        key = (_fold(location), _fold(food_type), _fold(meal_type))
+        entry = (expiry or NO_EXPIRY, -(quantity or 0), food_id)
+        row = {"Food_ID": food_id, "Food_Name": name, "Quantity": quantity, "Expiry_Date": expiry,
+               "Location": location, "Food_Type": food_type, "Meal_Type": meal_type}
+        self._listings[food_id] = (key, entry, row)
+        if not self._active[food_id]:
+            self._open(food_id)
+
+    def _open(self, food_id):
+        key, entry, _ = self._listings[food_id]
+        insort(self._buckets.setdefault(key, []), entry)
+        self._city_keys.setdefault(key[0], set()).add(key)
+
+    def _close(self, food_id):
+        key, entry, _ = self._listings[food_id]
+        bucket = self._buckets.get(key, [])
+        i = bisect_left(bucket, entry)
+        if i < len(bucket) and bucket[i] == entry:
+            del bucket[i]
+
+    def upsert_listing(self, food_id, name, quantity, expiry, location, food_type, meal_type):
+        with self._lock:
+            self.remove_listing(food_id)
+            if quantity and quantity > 0:
+                self._add_listing(food_id, name, quantity, expiry, location, food_type, meal_type)
+
+    def remove_listing(self, food_id):
+        with self._lock:
+            if food_id in self._listings:
+                if not self._active[food_id]:
+                    self._close(food_id)
+                del self._listings[food_id]
+
+    def upsert_receiver(self, receiver_id, city):
+        with self._lock:
+            self._receivers[receiver_id] = _fold(city)
+
+    def remove_receiver(self, receiver_id):
+        with self._lock:
+            self._receivers.pop(receiver_id, None)
+
+    def save_claim(self, claim_id, food_id, receiver_id, status):
+        with self._lock:
+            self.delete_claim(claim_id)
+            if status in ACTIVE_STATUSES and food_id is not None:
+                self._claims[claim_id] = (food_id, receiver_id)
+                self._receiver_claims[receiver_id] += 1
+                self._active[food_id] += 1
+                if self._active[food_id] == 1 and food_id in self._listings:
+                    self._close(food_id)
+
+    def delete_claim(self, claim_id):
+        with self._lock:
+            if claim_id not in self._claims:
+                return
+            food_id, receiver_id = self._claims.pop(claim_id)
+            self._receiver_claims[receiver_id] -= 1
+            self._active[food_id] -= 1
+            if not self._active[food_id] and food_id in self._listings:
+                self._open(food_id)
+
+    def apply_write(self, query, params, rowid=None):
+        # Mirror a WRITE_QUERIES statement that has just committed
+        name = WRITE_NAMES.get(query)
+        if name is None or not self.loaded:
+            return
+        p = list(params or ())
+        with self._lock:
+            if name == "insert receiver":
+                self.upsert_receiver(rowid, p[2])
+            elif name == "upsert receiver":
+                self.upsert_receiver(p[0], p[3])
+            elif name == "delete receiver":
+                self.remove_receiver(p[0])
+            elif name == "insert food listing":
+                self.upsert_listing(rowid, p[0], p[1], p[2], p[5], p[6], p[7])
+            elif name == "upsert food listing":
+                self.upsert_listing(p[0], p[1], p[2], p[3], p[6], p[7], p[8])
+            elif name == "delete food listing":
+                self.remove_listing(p[0])
+            elif name == "insert claim":
+                self.save_claim(rowid, p[0], p[1], p[2])
+            elif name == "upsert claim":
+                self.save_claim(p[0], p[1], p[2], p[3])
+            elif name == "delete claim":
+                self.delete_claim(p[0])
+
+    # ---------- queries ----------
+    def _candidates(self, city, food_type=None, meal_type=None, today=None):
+        today = (today or date.today()).isoformat()
+        keys = [
+            k for k in self._city_keys.get(city, ())
+            if (food_type is None or k[1] == _fold(food_type))
+            and (meal_type is None or k[2] == _fold(meal_type))
+        ]
+        for expiry, _, food_id in heapq.merge(*(self._buckets[k] for k in keys)):
+            if expiry >= today:
+                yield food_id
+
+    def best_for(self, receiver_id, n=5, food_type=None, meal_type=None, today=None):
+        with self._lock:
+            city = self._receivers.get(receiver_id)
+            if city is None:
+                return []
+            picks = islice(self._candidates(city, food_type, meal_type, today), n)
+            return [dict(self._listings[fid][2]) for fid in picks]
+
+    def pending_receivers(self):
+        with self._lock:
+            return sorted(rid for rid in self._receivers if not self._receiver_claims[rid])
+
+    def assign_pending(self, receiver_ids=None, today=None):
+        # Greedy: each receiver (in ID order) takes the soonest-expiring open
+        # listing in its city that no earlier receiver took in this pass.
+        with self._lock:
+            taken = set()
+            assignments = []
+            for rid in receiver_ids if receiver_ids is not None else self.pending_receivers():
+                city = self._receivers.get(rid)
+                if city is None:
+                    continue
+                for fid in self._candidates(city, today=today):
+                    if fid not in taken:
+                        taken.add(fid)
+                        assignments.append({"Receiver_ID": rid, **self._listings[fid][2]})
+                        break
+            return assignments
+
+MATCH_INDEX = MatchIndex()
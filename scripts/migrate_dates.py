@@ -0,0 +1,62 @@
+"""One-time migration of stored dates to the ISO formats in scripts/dates.py.
+
+Rewrites food_listings.Expiry_Date and claims.Timestamp in place, in primary
+key ranges of BATCH_ROWS with a commit per batch, so a large database is never
+locked for the whole run and an interrupted run can simply be restarted.
+create_schema() runs it automatically when the database's user_version is
+older than DATES_VERSION.
+
+    python -m scripts.migrate_dates --db db/food_wastage.db
+"""
+import argparse
+import sqlite3
+import time
+
+from scripts.dates import NORMALIZED_COLUMNS, register_functions
+
+BATCH_ROWS = 20_000
+
+def _primary_key(conn, table):
+    return next(row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[5])
+
+def migrate_column(conn, table, column, fn, batch_rows=BATCH_ROWS):
+    pk = _primary_key(conn, table)
+    lo, hi = conn.execute(f"SELECT MIN({pk}), MAX({pk}) FROM {table}").fetchone()
+    if lo is None:
+        return 0
+    changed = 0
+    start = lo
+    while start <= hi:
+        cur = conn.execute(
+            f"UPDATE {table} SET {column} = {fn}({column}) "
+            f"WHERE {pk} >= ? AND {pk} < ? AND {column} IS NOT {fn}({column})",
+            (start, start + batch_rows),
+        )
+        conn.commit()
+        changed += cur.rowcount
+        start += batch_rows
+    return changed
+
+def migrate_dates(conn, batch_rows=BATCH_ROWS, verbose=False):
+    register_functions(conn)
+    results = {}
+    for (table, column), fn in NORMALIZED_COLUMNS.items():
+        started = time.perf_counter()
+        results[(table, column)] = migrate_column(conn, table, column, fn, batch_rows)
+        if verbose:
+            print(f"{table}.{column}: {results[(table, column)]} rows rewritten "
+                  f"in {time.perf_counter() - started:.2f}s")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="db/food_wastage.db")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    migrate_dates(conn, args.batch_rows, verbose=True)
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""SQL-side search, ordering and paging for the CRUD tables.
+
+Builds (sql, params) pairs so that only the visible page and a row count leave
+SQLite. page_query() uses LIMIT/OFFSET for numbered pages, or keyset paging on
+the primary key when `after` (the last key of the previous page) is given.
+Tables with FTS5 indexes (scripts/search.py) are searched through them and
+ranked by relevance; the rest, and terms under 3 characters, fall back to LIKE.
+"""
+from datetime import date
+
+from scripts.create_tables import TABLE_KEYS
+from scripts.search import FTS_COLUMNS, match_expression
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Columns matched by the tab search boxes (case-insensitive substring)
+SEARCH_COLUMNS = {
+    "providers": ["Name", "City", "Type"],
+    "receivers": ["Name", "City", "Type"],
+    "food_listings": ["Food_Name", "Location", "Food_Type", "Meal_Type"],
+    "claims": ["Status", "Timestamp", "Claim_ID", "Food_ID", "Receiver_ID"],
+}
+
+# Extra columns computed in SQL for each page row
+COMPUTED_COLUMNS = {
+    "food_listings": "CAST(julianday(t.Expiry_Date) - julianday(?) AS INTEGER) AS Days_To_Expiry",
+}
+
+def _like_pattern(search):
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def search_clause(table, search):
+    search = (search or "").strip()
+    if not search:
+        return "", ()
+    cols = SEARCH_COLUMNS[table]
+    clause = " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in cols)
+    return f"WHERE ({clause})", (_like_pattern(search),) * len(cols)
+
+def fts_source(table, search):
+    search = (search or "").strip()
+    if table not in FTS_COLUMNS or not search:
+        return None, None
+    suffix, expr = match_expression(search)
+    return (f"{table}_{suffix}", expr) if suffix else (None, None)
+
+def count_query(table, search=""):
+    fts, expr = fts_source(table, search)
+    if fts:
+        return f"SELECT COUNT(*) AS total FROM {fts} WHERE {fts} MATCH ?", (expr,)
+    where, params = search_clause(table, search)
+    return f"SELECT COUNT(*) AS total FROM {table} {where}", params
+
+def _select_list(table, columns, today):
+    # Computed columns are evaluated per page row, so their inputs are bound
+    # (today's date keeps the cache key from outliving the day)
+    cols = "t.*" if columns == "*" else columns
+    extra = COMPUTED_COLUMNS.get(table)
+    if not extra:
+        return cols, ()
+    return f"{cols}, {extra}", ((today or date.today()).isoformat(),)
+
+def page_query(table, search="", page=1, page_size=PAGE_SIZE, after=None, columns="*", today=None):
+    if table not in TABLE_KEYS:
+        raise ValueError(f"Unknown table: {table}")
+    pk = TABLE_KEYS[table]
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    offset = (max(1, int(page)) - 1) * page_size
+    select, select_params = _select_list(table, columns, today)
+    fts, expr = fts_source(table, search)
+    if fts and after is None:
+        return (f"SELECT {select} FROM {fts} JOIN {table} t ON t.{pk} = {fts}.rowid "
+                f"WHERE {fts} MATCH ? ORDER BY {fts}.rank LIMIT ? OFFSET ?",
+                select_params + (expr, page_size, offset))
+    if fts:
+        where, params = f"WHERE t.{pk} IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?)", (expr,)
+    else:
+        where, params = search_clause(table, search)
+    if after is not None:
+        where = f"{where} AND t.{pk} > ?" if where else f"WHERE t.{pk} > ?"
+        return (f"SELECT {select} FROM {table} t {where} ORDER BY t.{pk} LIMIT ?",
+                select_params + params + (after, page_size))
+    return (f"SELECT {select} FROM {table} t {where} ORDER BY t.{pk} LIMIT ? OFFSET ?",
+            select_params + params + (page_size, offset))
+
+def page_count(total, page_size=PAGE_SIZE):
+    return max(1, -(-int(total) // page_size))
@@ -0,0 +1,144 @@
+"""Parallel execution of independent dashboard reads.
+
+The dashboard's chart and SQL-output queries do not depend on each other.
+QueryExecutor runs them concurrently on a pool of read-only SQLite
+connections (WAL lets any number of readers run next to the writer).
+Batch.as_completed() yields each result as soon as it is ready, so the page
+fills in while the slowest query is still running.
+
+Each query gets a deadline (QUERY_TIMEOUT). A SQLite progress handler
+interrupts it once the deadline passes or the batch is cancelled; cancel()
+is what app.py calls when Streamlit abandons the rerun. mode="thread" keeps
+one connection per pool thread. mode="process" runs the queries in worker
+processes, which avoids the GIL when pandas-side work dominates. A process
+worker cannot see the cancel flag, so a running query there stops at its
+deadline, and only queued queries are dropped on cancel.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from scripts import db
+
+MODES = ("sequential", "thread", "process")
+WORKERS = min(8, os.cpu_count() or 4)
+QUERY_TIMEOUT = 10.0     # seconds per query
+PROGRESS_STEPS = 10_000  # SQLite VM steps between deadline/cancel checks
+
+# The database is already in WAL mode; readers only need the cache settings
+READ_PRAGMAS = db.PRAGMAS + ["PRAGMA query_only=ON"]
+
+class QueryTimeout(Exception):
+    pass
+
+def open_readonly(db_path):
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    for pragma in READ_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _fetch(conn, query, params, deadline, cancelled=None):
+    def interrupt():
+        return time.time() > deadline or (cancelled is not None and cancelled.is_set())
+
+    conn.set_progress_handler(interrupt, PROGRESS_STEPS)
+    started = time.perf_counter()
+    try:
+        cur = conn.execute(query, params or ())
+        columns = [d[0] for d in cur.description]
+        rows = cur.fetchall()
+    except sqlite3.OperationalError as e:
+        if "interrupted" in str(e) and time.time() > deadline:
+            raise QueryTimeout("query ran past its deadline") from None
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+    return columns, rows, time.perf_counter() - started
+
+# ---------- process workers ----------
+_process_conn = None
+
+def _process_init(db_path):
+    global _process_conn
+    _process_conn = open_readonly(db_path)
+
+def _process_fetch(query, params, deadline):
+    return _fetch(_process_conn, query, params, deadline)
+
+class Batch:
+    def __init__(self, futures, cancelled):
+        self._futures = futures  # future -> key
+        self._cancelled = cancelled
+
+    def as_completed(self, timeout=None):
+        # Yields (key, (columns, rows, seconds) or None, error or None)
+        pending = set(self._futures)
+        end = None if timeout is None else time.time() + timeout
+        while pending:
+            done, pending = wait(pending, None if end is None else max(0, end - time.time()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.cancelled():
+                    continue
+                error = future.exception()
+                yield self._futures[future], None if error else future.result(), error
+        for future in pending:
+            future.cancel()
+
+    def cancel(self):
+        if self._cancelled is not None:
+            self._cancelled.set()
+        for future in self._futures:
+            future.cancel()
+
+class QueryExecutor:
+    def __init__(self, db_path=db.DB_PATH, mode="thread", workers=WORKERS, timeout=QUERY_TIMEOUT):
+        if mode not in MODES[1:]:
+            raise ValueError(f"mode must be 'thread' or 'process', not {mode!r}")
+        db.ensure_schema(db_path)
+        self.db_path = db_path
+        self.mode = mode
+        self.timeout = timeout
+        self._local = threading.local()
+        if mode == "process":
+            self._pool = ProcessPoolExecutor(workers, initializer=_process_init, initargs=(db_path,))
+        else:
+            self._pool = ThreadPoolExecutor(workers, thread_name_prefix="dashboard-read")
+
+    def _thread_fetch(self, query, params, deadline, cancelled):
+        # Pool threads live as long as the executor, so a connection per thread is safe here
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = open_readonly(self.db_path)
+        return _fetch(conn, query, params, deadline, cancelled)
+
+    def submit(self, jobs):
+        # jobs: {key: (query, params)}
+        deadline = time.time() + self.timeout
+        if self.mode == "process":
+            cancelled = None
+            futures = {self._pool.submit(_process_fetch, q, p, deadline): key for key, (q, p) in jobs.items()}
+        else:
+            cancelled = threading.Event()
+            futures = {self._pool.submit(self._thread_fetch, q, p, deadline, cancelled): key
+                       for key, (q, p) in jobs.items()}
+        return Batch(futures, cancelled)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+def get_executor(db_path=db.DB_PATH, mode="thread", workers=WORKERS):
+    with _executors_lock:
+        key = (db_path, mode, workers)
+        executor = _executors.get(key)
+        if executor is None:
+            executor = _executors[key] = QueryExecutor(db_path, mode, workers)
+        return executor
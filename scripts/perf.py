@@ -0,0 +1,155 @@
+"""Rerun timing and query profiling for app.py.
+
+Streamlit re-executes app.py on every widget interaction. timed() logs how
+long a block took. record_rerun() logs the whole rerun; the first rerun in a
+process is logged as the cold start (imports, schema init, first queries).
+Timings go to the "food_wastage.perf" logger at INFO and to `stats` for the
+sidebar.
+
+PROFILE is a ring buffer of the last RING_SIZE query executions: wall time,
+rows, bytes handed to pandas, cache hit/miss, and the view (source()) plus
+query name that issued it. summary() gives p50/p95/p99 per query, and
+to_jsonl() exports the raw records. With FOOD_WASTAGE_SQL_TRACE=1, every
+pooled connection also gets a sqlite3 trace callback. That callback records
+each statement SQLite runs, including ones the app never issued itself
+(trigger bodies, schema checks).
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+log = logging.getLogger("food_wastage.perf")
+if not log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s perf %(message)s"))
+    log.addHandler(_handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+stats = {"reruns": 0, "cold_start_ms": None, "last_rerun_ms": None, "last_view": None}
+
+_lock = threading.Lock()
+
+@contextmanager
+def timed(label):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        log.info("%s %.1f ms", label, (time.perf_counter() - started) * 1000)
+
+def record_rerun(view, started):
+    ms = round((time.perf_counter() - started) * 1000, 1)
+    with _lock:
+        cold = stats["cold_start_ms"] is None
+        if cold:
+            stats["cold_start_ms"] = ms
+        stats["reruns"] += 1
+        stats["last_rerun_ms"] = ms
+        stats["last_view"] = view
+    log.info("%s %s %.1f ms", "cold start" if cold else "rerun", view, ms)
+    return ms
+
+# ---------- query profile ----------
+RING_SIZE = 5000
+ADMIN_ENV = "FOOD_WASTAGE_ADMIN"        # show the profiling panel in the sidebar
+TRACE_ENV = "FOOD_WASTAGE_SQL_TRACE"    # attach the sqlite3 trace callback
+
+TRACE_SQL = os.environ.get(TRACE_ENV) == "1"
+
+_context = threading.local()
+_SPACE = re.compile(r"\s+")
+
+def is_admin():
+    return os.environ.get(ADMIN_ENV) == "1"
+
+@contextmanager
+def source(name):
+    # Tag queries issued inside the block with the view that asked for them
+    previous = getattr(_context, "source", None)
+    _context.source = name
+    try:
+        yield
+    finally:
+        _context.source = previous
+
+def current_source():
+    return getattr(_context, "source", None)
+
+def query_label(sql, width=60):
+    text = _SPACE.sub(" ", sql).strip()
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+class QueryProfile:
+    def __init__(self, size=RING_SIZE):
+        self._ring = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds=None, rows=None, nbytes=None, cache=None, kind="read", sql=None):
+        entry = {
+            "ts": round(time.time(), 3),
+            "source": current_source(),
+            "label": label,
+            "kind": kind,
+            "ms": None if seconds is None else round(seconds * 1000, 3),
+            "rows": rows,
+            "bytes": nbytes,
+            "cache": cache,
+            "sql": sql,
+        }
+        with self._lock:
+            self._ring.append(entry)
+
+    def records(self):
+        with self._lock:
+            return list(self._ring)
+
+    def summary(self):
+        groups = {}
+        for r in self.records():
+            groups.setdefault((r["kind"], r["label"]), []).append(r)
+        rows = []
+        for (kind, label), entries in groups.items():
+            times = sorted(r["ms"] for r in entries if r["ms"] is not None)
+            row = {
+                "query": label,
+                "kind": kind,
+                "sources": ", ".join(sorted({r["source"] for r in entries if r["source"]})),
+                "calls": len(entries),
+                "hits": sum(r["cache"] == "hit" for r in entries),
+                "p50_ms": _percentile(times, 0.50) if times else None,
+                "p95_ms": _percentile(times, 0.95) if times else None,
+                "p99_ms": _percentile(times, 0.99) if times else None,
+                "total_ms": round(sum(times), 3),
+                "rows": sum(r["rows"] or 0 for r in entries),
+                "bytes": sum(r["bytes"] or 0 for r in entries),
+            }
+            rows.append(row)
+        return sorted(rows, key=lambda r: -r["total_ms"])
+
+    def to_jsonl(self):
+        return "".join(json.dumps(r) + "\n" for r in self.records())
+
+    def export_jsonl(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_jsonl())
+
+    def clear(self):
+        with self._lock:
+            self._ring.clear()
+
+PROFILE = QueryProfile()
+
+def trace(conn):
+    # sqlite3 reports statements as they start, so traces carry no timing
+    if TRACE_SQL:
+        conn.set_trace_callback(lambda stmt: PROFILE.record(query_label(stmt), kind="trace", sql=stmt))
+    return conn
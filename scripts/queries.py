@@ -9,8 +9,8 @@ SQL_QUERIES = {
     "Provider contacts by city (use sidebar filter)":
         "SELECT Name, Type, Contact FROM providers WHERE City = ? ORDER BY Name",
     "Top receivers by claims":
-        """SELECT r.Name, COUNT(c.Claim_ID) AS claims
-           FROM receivers r JOIN claims c ON r.Receiver_ID = c.Receiver_ID
+        """SELECT r.Name, SUM(c.Claims) AS claims
+           FROM receivers r JOIN claim_facts c ON r.Receiver_ID = c.Receiver_ID
            GROUP BY r.Name ORDER BY claims DESC""",
 
     # Listings & Availability
@@ -24,31 +24,34 @@ SQL_QUERIES = {
     "Most common meal types":
         "SELECT Meal_Type, COUNT(*) AS count FROM food_listings GROUP BY Meal_Type ORDER BY count DESC",
 
-    # Claims & Distribution
+    # Claims & Distribution. Claim counts read claim_facts (scripts/archive.py),
+    # which adds the archived claims' rollup counts to the hot claims table.
     "Claims per food item":
-        """SELECT f.Food_Name, COUNT(c.Claim_ID) AS total_claims
-           FROM claims c JOIN food_listings f ON c.Food_ID = f.Food_ID
+        """SELECT f.Food_Name, SUM(c.Claims) AS total_claims
+           FROM claim_facts c JOIN food_listings f ON c.Food_ID = f.Food_ID
            GROUP BY f.Food_Name ORDER BY total_claims DESC""",
     "Top provider by successful claims":
-        """SELECT p.Name, COUNT(*) AS success_claims
-           FROM claims c
+        """SELECT p.Name, SUM(c.Claims) AS success_claims
+           FROM claim_facts c
            JOIN food_listings f ON c.Food_ID = f.Food_ID
            JOIN providers p ON f.Provider_ID = p.Provider_ID
            WHERE c.Status='Completed'
            GROUP BY p.Name ORDER BY success_claims DESC LIMIT 5""",
     "Claim status percentage":
         """SELECT Status,
-                  ROUND(100.0 * COUNT(*) / (SELECT COUNT(*) FROM claims), 2) AS percentage
-           FROM claims GROUP BY Status""",
+                  ROUND(100.0 * SUM(Claims) / (SELECT SUM(Claims) FROM claim_facts), 2) AS percentage
+           FROM claim_facts GROUP BY Status""",
     "Average quantity claimed per receiver (proxy by item qty)":
-        """SELECT r.Name, ROUND(AVG(f.Quantity),2) AS avg_quantity
-           FROM claims c
+        """SELECT r.Name,
+                  ROUND(SUM(f.Quantity * c.Claims) * 1.0
+                        / SUM(CASE WHEN f.Quantity IS NOT NULL THEN c.Claims END), 2) AS avg_quantity
+           FROM claim_facts c
            JOIN food_listings f ON c.Food_ID = f.Food_ID
            JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
            GROUP BY r.Name ORDER BY avg_quantity DESC""",
     "Most claimed meal type":
-        """SELECT f.Meal_Type, COUNT(*) AS claims
-           FROM food_listings f JOIN claims c ON f.Food_ID = c.Food_ID
+        """SELECT f.Meal_Type, SUM(c.Claims) AS claims
+           FROM food_listings f JOIN claim_facts c ON f.Food_ID = c.Food_ID
            GROUP BY f.Meal_Type ORDER BY claims DESC""",
     "Total food donated by each provider":
         """SELECT p.Name, SUM(f.Quantity) AS total_donated
@@ -56,8 +59,109 @@ SQL_QUERIES = {
            GROUP BY p.Name ORDER BY total_donated DESC""",
     # Extra (15th): Top cities by completed claims
     "Top cities by completed claims":
-        """SELECT f.Location AS City, COUNT(*) AS completed_claims
-           FROM claims c JOIN food_listings f ON c.Food_ID = f.Food_ID
+        """SELECT f.Location AS City, SUM(c.Claims) AS completed_claims
+           FROM claim_facts c JOIN food_listings f ON c.Food_ID = f.Food_ID
            WHERE c.Status='Completed'
            GROUP BY f.Location ORDER BY completed_claims DESC"""
 }
+
+
+# Same results as the matching SQL_QUERIES entries, served from the
+# trigger-maintained aggregates table (scripts/aggregates.py)
+AGG_QUERIES = {
+    "Providers per city":
+        """SELECT NULLIF(Key, '') AS City, Value AS total_providers
+           FROM aggregates WHERE Metric = 'providers_city' AND Value > 0 ORDER BY total_providers DESC""",
+    "Receivers per city":
+        """SELECT NULLIF(Key, '') AS City, Value AS total_receivers
+           FROM aggregates WHERE Metric = 'receivers_city' AND Value > 0 ORDER BY total_receivers DESC""",
+    "Top food provider types":
+        """SELECT NULLIF(Key, '') AS Type, Value AS contributions
+           FROM aggregates WHERE Metric = 'providers_type' AND Value > 0 ORDER BY contributions DESC""",
+    "Total food quantity available":
+        """SELECT (SELECT Value FROM aggregates WHERE Metric = 'food_quantity' AND Key = '') AS total_quantity""",
+    "City with most food listings":
+        """SELECT NULLIF(Key, '') AS Location, Value AS listings
+           FROM aggregates WHERE Metric = 'food_location' AND Value > 0 ORDER BY listings DESC LIMIT 5""",
+    "Most common food types":
+        """SELECT NULLIF(Key, '') AS Food_Type, Value AS count
+           FROM aggregates WHERE Metric = 'food_type' AND Value > 0 ORDER BY count DESC""",
+    "Most common meal types":
+        """SELECT NULLIF(Key, '') AS Meal_Type, Value AS count
+           FROM aggregates WHERE Metric = 'food_meal' AND Value > 0 ORDER BY count DESC""",
+    "Claim status percentage":
+        """SELECT NULLIF(Key, '') AS Status,
+                  ROUND(100.0 * Value / (SELECT SUM(Value) FROM aggregates WHERE Metric = 'claims_status'), 2) AS percentage
+           FROM aggregates WHERE Metric = 'claims_status' AND Value > 0""",
+}
+
+# Dashboard charts in app.py
+CHART_QUERIES = {
+    "Provider types": AGG_QUERIES["Top food provider types"],
+    "Food types": AGG_QUERIES["Most common food types"],
+    "Claim status percentage": AGG_QUERIES["Claim status percentage"],
+    "Listings per city":
+        """SELECT NULLIF(Key, '') AS City, Value AS listings
+           FROM aggregates WHERE Metric = 'food_location' AND Value > 0 ORDER BY listings DESC LIMIT 10""",
+    # Daily completed claims trend
+    "Completed claims over time":
+        """SELECT Key AS day, Value AS completed
+           FROM aggregates WHERE Metric = 'claims_completed_day' AND Value > 0 ORDER BY day""",
+}
+
+# CRUD writes issued by the tabs in app.py
+WRITE_QUERIES = {
+    "insert provider":
+        "INSERT INTO providers(Name, Type, Address, City, Contact) VALUES (?,?,?,?,?)",
+    "upsert provider":
+        """INSERT INTO providers(Provider_ID, Name, Type, Address, City, Contact)
+           VALUES (?,?,?,?,?,?)
+           ON CONFLICT(Provider_ID) DO UPDATE SET
+               Name=excluded.Name, Type=excluded.Type, Address=excluded.Address,
+               City=excluded.City, Contact=excluded.Contact""",
+    "delete provider":
+        "DELETE FROM providers WHERE Provider_ID = ?",
+    "insert receiver":
+        "INSERT INTO receivers(Name, Type, City, Contact) VALUES (?,?,?,?)",
+    "upsert receiver":
+        """INSERT INTO receivers(Receiver_ID, Name, Type, City, Contact)
+           VALUES (?,?,?,?,?)
+           ON CONFLICT(Receiver_ID) DO UPDATE SET
+               Name=excluded.Name, Type=excluded.Type, City=excluded.City, Contact=excluded.Contact""",
+    "delete receiver":
+        "DELETE FROM receivers WHERE Receiver_ID = ?",
+    "insert food listing":
+        """INSERT INTO food_listings
+           (Food_Name, Quantity, Expiry_Date, Provider_ID, Provider_Type, Location, Food_Type, Meal_Type)
+           VALUES (?,?,?,?,?,?,?,?)""",
+    "upsert food listing":
+        """INSERT INTO food_listings
+           (Food_ID, Food_Name, Quantity, Expiry_Date, Provider_ID, Provider_Type, Location, Food_Type, Meal_Type)
+           VALUES (?,?,?,?,?,?,?,?,?)
+           ON CONFLICT(Food_ID) DO UPDATE SET
+             Food_Name=excluded.Food_Name,
+             Quantity=excluded.Quantity,
+             Expiry_Date=excluded.Expiry_Date,
+             Provider_ID=excluded.Provider_ID,
+             Provider_Type=excluded.Provider_Type,
+             Location=excluded.Location,
+             Food_Type=excluded.Food_Type,
+             Meal_Type=excluded.Meal_Type""",
+    "delete food listing":
+        "DELETE FROM food_listings WHERE Food_ID = ?",
+    "insert claim":
+        "INSERT INTO claims(Food_ID, Receiver_ID, Status, Timestamp) VALUES (?,?,?,?)",
+    "upsert claim":
+        """INSERT INTO claims(Claim_ID, Food_ID, Receiver_ID, Status, Timestamp)
+           VALUES (?,?,?,?,?)
+           ON CONFLICT(Claim_ID) DO UPDATE SET
+             Food_ID=excluded.Food_ID,
+             Receiver_ID=excluded.Receiver_ID,
+             Status=excluded.Status,
+             Timestamp=excluded.Timestamp""",
+    "delete claim":
+        "DELETE FROM claims WHERE Claim_ID = ?",
+}
+
+# WRITE_QUERIES name for each statement, for callers that get only the SQL
+WRITE_NAMES = {sql: name for name, sql in WRITE_QUERIES.items()}
@@ -0,0 +1,324 @@
+"""Time-series rollups per provider and per city.
+
+`rollups` holds one row per (grain, dimension, key, bucket, metric):
+
+  grains      hour, day, week (weeks start on Monday)
+  dimensions  provider (Provider_ID) and city (listing Location)
+  metrics     listings, quantity_listed         - by listing Expiry_Date
+              claims_pending/completed/cancelled - by claim Timestamp
+              quantity_donated                   - listing Quantity of completed claims
+
+Listings carry no creation time, so they are bucketed by their expiry date
+(day and week only). Claims count under their listing's provider, city and
+quantity. claim_attribution holds the values each claim was counted under:
+claim deletes and updates subtract those, and a listing insert or a change
+to its Provider_ID, Location or Quantity moves its claims' counts across.
+A claim whose listing is gone keeps its last attribution. rebuild_rollups()
+recomputes everything from the current rows and gives the same table.
+
+Triggers apply +/- deltas on every write, like scripts/aggregates.py, and
+archival deletes leave the history alone. downsample() drops hourly rows
+after RETENTION["hour"] and daily rows after RETENTION["day"]; weekly rows
+are kept. Every grain is maintained from the start, so dropping a finer
+grain loses no totals. A series is one primary-key range read:
+Grain, Dim, Dim_Key, then Bucket.
+"""
+import argparse
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from logging import getLogger
+
+from scripts.aggregates import history_source
+from scripts.dates import ISO_DATE, ISO_TIMESTAMP, parse_datetime
+from scripts.guard import GUARDED
+
+ROLLUPS_DDL = """
+CREATE TABLE IF NOT EXISTS rollups (
+    Grain TEXT NOT NULL,
+    Dim TEXT NOT NULL,
+    Dim_Key TEXT NOT NULL,
+    Bucket TEXT NOT NULL,
+    Metric TEXT NOT NULL,
+    Value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (Grain, Dim, Dim_Key, Bucket, Metric)
+) WITHOUT ROWID;
+"""
+
+ATTRIBUTION_DDL = """
+CREATE TABLE IF NOT EXISTS claim_attribution (
+    Claim_ID INTEGER PRIMARY KEY,
+    Provider_ID INTEGER,
+    Location TEXT,
+    Quantity INTEGER
+);
+"""
+
+# grain -> bucket start expression over {t}, and the Python step between buckets
+GRAINS = {
+    "hour": ("strftime('%Y-%m-%d %H:00:00', {t})", timedelta(hours=1)),
+    "day": ("date({t})", timedelta(days=1)),
+    "week": ("date({t}, 'weekday 0', '-6 days')", timedelta(weeks=1)),
+}
+
+# Days a grain is kept; None keeps it forever
+RETENTION = {"hour": 14, "day": 400, "week": None}
+DOWNSAMPLE_INTERVAL = 3600  # seconds between scheduled runs
+MAX_BUCKETS = 10_000  # per series: about 14 months of hours, 190 years of weeks
+
+# table -> (time expression, grains, join, {dimension: key expression},
+#           [(metric expression, value expression, row condition)])
+# {r}. is the row prefix (NEW./OLD. in triggers, r. in rebuilds); f. is the claim's
+# attribution row
+SOURCES = {
+    "food_listings": (
+        "{r}Expiry_Date", ("day", "week"), "",
+        {"provider": "{r}Provider_ID", "city": "{r}Location"},
+        [("'listings'", "1", "1"),
+         ("'quantity_listed'", "IFNULL({r}Quantity, 0)", "1")],
+    ),
+    "claims": (
+        "{r}Timestamp", ("hour", "day", "week"), "LEFT JOIN claim_attribution f ON f.Claim_ID = {r}Claim_ID",
+        {"provider": "f.Provider_ID", "city": "f.Location"},
+        [("'claims_' || lower({r}Status)", "1", "{r}Status IS NOT NULL"),
+         ("'quantity_donated'", "IFNULL(f.Quantity, 0)", "{r}Status = 'Completed'")],
+    ),
+}
+
+METRICS = ["listings", "quantity_listed", "claims_pending", "claims_completed", "claims_cancelled",
+           "quantity_donated"]
+DIMENSIONS = ("provider", "city")
+
+SERIES_QUERY = """SELECT Bucket, Metric, Value FROM rollups
+                  WHERE Grain = ? AND Dim = ? AND Dim_Key = ? AND Bucket BETWEEN ? AND ?
+                  ORDER BY Bucket"""
+
+log = getLogger("food_wastage.rollups")
+
+# Listing columns a claim is attributed by
+ATTRIBUTED = ("Provider_ID", "Location", "Quantity")
+
+def _statements(table, row, sign="", source=None):
+    # Per-row deltas for triggers, or grouped totals over `source` (rebuilds,
+    # re-attribution)
+    t, grains, join, dims, metrics = SOURCES[table]
+    t, join = t.format(r=row), join.format(r=row)
+    grouped = source is not None
+    source = f"{source} r {join}" if grouped else f"(SELECT 1) {join}"
+    out = []
+    for grain in grains:
+        bucket = GRAINS[grain][0].format(t=t)
+        for dim, key in dims.items():
+            key = key.format(r=row)
+            for metric, value, cond in metrics:
+                metric, value, cond = (e.format(r=row) for e in (metric, value, cond))
+                value = f"{sign}SUM({value})" if grouped else f"{sign}({value})"
+                group = " GROUP BY 3, 4, 5" if grouped else ""
+                out.append(
+                    f"INSERT INTO rollups (Grain, Dim, Dim_Key, Bucket, Metric, Value) "
+                    f"SELECT '{grain}', '{dim}', IFNULL({key}, ''), {bucket}, {metric}, {value} "
+                    f"FROM {source} WHERE {cond} AND {bucket} IS NOT NULL{group} "
+                    f"ON CONFLICT(Grain, Dim, Dim_Key, Bucket, Metric) DO UPDATE SET Value = Value + excluded.Value;"
+                )
+    return out
+
+def attribute_sql(row, source):
+    # (Re)attribute the claims in `source` to their listing's current values.
+    # Every claim gets a row; one whose listing is gone keeps the values it had.
+    cols = ", ".join(ATTRIBUTED)
+    sets = ", ".join(f"{c} = excluded.{c}" for c in ATTRIBUTED)
+    listing = ", ".join(f"f.{c}" for c in ATTRIBUTED)
+    return [
+        # DO NOTHING rather than OR IGNORE, which an outer upsert's conflict handling overrides
+        f"INSERT INTO claim_attribution (Claim_ID) SELECT {row}Claim_ID FROM {source} WHERE 1 "
+        f"ON CONFLICT(Claim_ID) DO NOTHING;",
+        f"INSERT INTO claim_attribution (Claim_ID, {cols}) SELECT {row}Claim_ID, {listing} "
+        f"FROM {source} JOIN food_listings f ON f.Food_ID = {row}Food_ID WHERE 1 "
+        f"ON CONFLICT(Claim_ID) DO UPDATE SET {sets};",
+    ]
+
+def trigger_sql(table):
+    inserts = "\n".join(_statements(table, "NEW.", "+"))
+    deletes = "\n".join(_statements(table, "OLD.", "-"))
+    if table != "claims":
+        return [
+            f"CREATE TRIGGER roll_{table}_ins AFTER INSERT ON {table} BEGIN\n{inserts}\nEND",
+            f"CREATE TRIGGER roll_{table}_del AFTER DELETE ON {table} WHEN {GUARDED} BEGIN\n{deletes}\nEND",
+            f"CREATE TRIGGER roll_{table}_upd AFTER UPDATE ON {table} BEGIN\n{deletes}\n{inserts}\nEND",
+        ]
+    # Claims add after attributing and subtract before dropping the attribution;
+    # archival deletes keep it, since the archived claim still counts
+    attribute = "\n".join(attribute_sql("NEW.", "(SELECT 1)"))
+    forget = "DELETE FROM claim_attribution WHERE Claim_ID = OLD.Claim_ID;"
+    return [
+        f"CREATE TRIGGER roll_claims_ins AFTER INSERT ON claims BEGIN\n{attribute}\n{inserts}\nEND",
+        f"CREATE TRIGGER roll_claims_del AFTER DELETE ON claims WHEN {GUARDED} BEGIN\n{deletes}\n{forget}\nEND",
+        f"CREATE TRIGGER roll_claims_upd AFTER UPDATE ON claims BEGIN\n{deletes}\n"
+        f"DELETE FROM claim_attribution WHERE Claim_ID = OLD.Claim_ID AND OLD.Claim_ID IS NOT NEW.Claim_ID;\n"
+        f"{attribute}\n{inserts}\nEND",
+    ]
+
+def attribution_triggers(claims_source):
+    # A new listing, or a change to a column its claims are counted by, moves
+    # those claims (archived ones too) from their old buckets to the new ones
+    claims = f"(SELECT * FROM {claims_source} WHERE Food_ID = NEW.Food_ID)"
+    body = "\n".join([*_statements("claims", "r.", "-", claims),
+                      *attribute_sql("r.", f"{claims} r"),
+                      *_statements("claims", "r.", "+", claims)])
+    changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in ("Food_ID", *ATTRIBUTED))
+    return [
+        f"CREATE TRIGGER roll_attr_ins AFTER INSERT ON food_listings BEGIN\n{body}\nEND",
+        f"CREATE TRIGGER roll_attr_upd AFTER UPDATE OF Food_ID, {', '.join(ATTRIBUTED)} ON food_listings "
+        f"WHEN {changed} BEGIN\n{body}\nEND",
+    ]
+
+def rebuild_rollups(conn, now=None):
+    cur = conn.cursor()
+    claims = history_source(conn, "claims")
+    for stmt in attribute_sql("r.", f"{claims} r"):
+        cur.execute(stmt)
+    cur.execute(f"DELETE FROM claim_attribution WHERE Claim_ID NOT IN (SELECT Claim_ID FROM {claims})")
+    cur.execute("DELETE FROM rollups")
+    for table in SOURCES:
+        for stmt in _statements(table, "r.", source=history_source(conn, table)):
+            cur.execute(stmt)
+    conn.commit()
+    downsample(conn, now)
+
+def create_rollups(conn, rebuild=False):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='rollups'"
+    ).fetchone()
+    attributed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='claim_attribution'"
+    ).fetchone()
+    cur = conn.cursor()
+    cur.execute(ROLLUPS_DDL)
+    cur.execute(ATTRIBUTION_DDL)
+    # Recreated on every schema init so trigger bodies follow SOURCES
+    claims = history_source(conn, "claims")
+    for table in (*SOURCES, "attr"):
+        for event in ("ins", "del", "upd"):
+            cur.execute(f"DROP TRIGGER IF EXISTS roll_{table}_{event}")
+    for stmt in [*(s for table in SOURCES for s in trigger_sql(table)), *attribution_triggers(claims)]:
+        cur.execute(stmt)
+    conn.commit()
+    if rebuild or not exists or not attributed:
+        rebuild_rollups(conn)
+
+def downsample(conn, now=None):
+    # Returns {grain: rows dropped}
+    now = now or datetime.now()
+    dropped = {}
+    for grain, days in RETENTION.items():
+        if days is None:
+            continue
+        cutoff = floor(now - timedelta(days=days), grain)
+        dropped[grain] = conn.execute("DELETE FROM rollups WHERE Grain = ? AND Bucket < ?",
+                                      (grain, cutoff)).rowcount
+    conn.execute("DELETE FROM rollups WHERE Value = 0")
+    conn.commit()
+    return dropped
+
+# ---------- series ----------
+def floor(moment, grain):
+    # Bucket start for a datetime, in the text format stored in Bucket
+    if grain == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0).strftime(ISO_TIMESTAMP)
+    if grain == "week":
+        moment -= timedelta(days=moment.weekday())
+    return moment.strftime(ISO_DATE)
+
+def grain_for(start, now=None):
+    # Finest grain still kept at `start`
+    age = (now or datetime.now()) - start
+    for grain, days in RETENTION.items():
+        if days is None or age <= timedelta(days=days):
+            return grain
+    return "week"
+
+def bucket_count(grain, start, end):
+    first, last = (parse_datetime(floor(moment, grain)) for moment in (start, end))
+    return max(0, (last - first) // GRAINS[grain][1] + 1)
+
+def series_query(dim, key, grain, start, end):
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of {list(GRAINS)}, got {grain!r}")
+    if dim not in DIMENSIONS:
+        raise ValueError(f"dim must be one of {DIMENSIONS}, got {dim!r}")
+    if bucket_count(grain, start, end) > MAX_BUCKETS:
+        # shape() builds every bucket, empty ones included
+        raise ValueError(f"{start:%Y-%m-%d} to {end:%Y-%m-%d} is more than {MAX_BUCKETS} {grain} buckets; "
+                         f"choose a coarser grain or a later start")
+    return SERIES_QUERY, (grain, dim, "" if key is None else str(key), floor(start, grain), floor(end, grain))
+
+def shape(rows, grain, start, end, metrics=None):
+    # Chart-ready: {"grain", "buckets": [...], "series": {metric: [value per bucket]}}, gaps as 0
+    metrics = list(metrics or METRICS)
+    step = GRAINS[grain][1]
+    buckets = []
+    moment = parse_datetime(floor(start, grain))
+    last = parse_datetime(floor(end, grain))
+    while moment <= last:
+        buckets.append(floor(moment, grain))
+        moment += step
+    index = {b: i for i, b in enumerate(buckets)}
+    values = {m: [0] * len(buckets) for m in metrics}
+    for bucket, metric, value in rows:
+        if metric in values and bucket in index:
+            values[metric][index[bucket]] = value
+    return {"grain": grain, "buckets": buckets, "series": values}
+
+def series(conn, dim, key, start, end=None, grain=None, metrics=None):
+    end = end or datetime.now()
+    grain = grain or grain_for(start)
+    rows = conn.execute(*series_query(dim, key, grain, start, end)).fetchall()
+    return shape(rows, grain, start, end, metrics)
+
+# ---------- scheduling ----------
+_scheduled = set()
+_scheduled_lock = threading.Lock()
+
+def start_scheduler(db_path, interval=DOWNSAMPLE_INTERVAL, on_downsampled=None):
+    # One background downsampler per database file per process
+    with _scheduled_lock:
+        if db_path in _scheduled:
+            return
+        _scheduled.add(db_path)
+
+    # Imported here: scripts.db imports the schema modules, this one included
+    from scripts import db
+
+    def loop():
+        while True:
+            # The first run waits an interval too, so it never races page
+            # loads for the lock while the app starts up
+            time.sleep(interval)
+            try:
+                with db.connection(db_path) as conn:  # pooled: shared PRAGMAS and busy timeout
+                    dropped = downsample(conn)
+                if any(dropped.values()) and on_downsampled is not None:
+                    on_downsampled(dropped)
+            except sqlite3.Error:
+                log.exception("Rollup downsampling failed; retrying in %ss", interval)
+
+    threading.Thread(target=loop, name=f"rollups-downsampler:{db_path}", daemon=True).start()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="db/food_wastage.db")
+    parser.add_argument("--rebuild", action="store_true", help="recompute from the base tables first")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    started = time.perf_counter()
+    if args.rebuild:
+        rebuild_rollups(conn)
+    dropped = downsample(conn)
+    counts = dict(conn.execute("SELECT Grain, COUNT(*) FROM rollups GROUP BY Grain").fetchall())
+    conn.close()
+    print(f"Dropped {dropped}; kept {counts} in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
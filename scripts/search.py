@@ -0,0 +1,86 @@
+"""FTS5 search indexes for the Providers, Receivers and Food Listings tabs.
+
+Each table gets an external-content FTS5 index kept in sync by triggers:
+
+* <table>_tri  - trigram tokenizer; case-insensitive substring match for
+                 terms of 3+ characters (same results as LIKE '%term%')
+
+Matches are ranked with bm25 through the FTS5 `rank` column. Trigrams cannot
+answer 1-2 character terms, so those keep the plain LIKE substring scan
+(scripts/paging.py); a word-prefix index would return different rows.
+"""
+
+# Indexed columns per table; the same columns the tab search boxes cover
+FTS_COLUMNS = {
+    "providers": ("Provider_ID", ["Name", "City", "Type"]),
+    "receivers": ("Receiver_ID", ["Name", "City", "Type"]),
+    "food_listings": ("Food_ID", ["Food_Name", "Location", "Food_Type", "Meal_Type"]),
+}
+
+TOKENIZERS = {
+    "tri": "tokenize='trigram'",
+}
+DROPPED_TOKENIZERS = ["pfx"]  # word-prefix index for short terms; they use LIKE again
+
+MIN_TRIGRAM = 3
+
+def fts_tables(table):
+    return [f"{table}_{suffix}" for suffix in TOKENIZERS]
+
+def _triggers(table, fts):
+    pk, cols = FTS_COLUMNS[table]
+    col_list = ", ".join(cols)
+    new_vals = ", ".join(f"new.{c}" for c in cols)
+    old_vals = ", ".join(f"old.{c}" for c in cols)
+    insert = f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.{pk}, {new_vals});"
+    delete = f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.{pk}, {old_vals});"
+    return [
+        f"CREATE TRIGGER {fts}_ins AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER {fts}_del AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER {fts}_upd AFTER UPDATE ON {table} BEGIN {delete} {insert} END",
+    ]
+
+def drop_fts_triggers(conn, table):
+    for fts in fts_tables(table) + [f"{table}_{suffix}" for suffix in DROPPED_TOKENIZERS]:
+        for event in ("ins", "del", "upd"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {fts}_{event}")
+
+def create_fts_triggers(conn, table):
+    drop_fts_triggers(conn, table)
+    for fts in fts_tables(table):
+        for stmt in _triggers(table, fts):
+            conn.execute(stmt)
+
+def rebuild_fts(conn, tables=None):
+    for table in tables or FTS_COLUMNS:
+        for fts in fts_tables(table):
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    conn.commit()
+
+def create_fts(conn, rebuild=()):
+    cur = conn.cursor()
+    stale = {t for t in rebuild if t in FTS_COLUMNS}
+    for table, (pk, cols) in FTS_COLUMNS.items():
+        for suffix in DROPPED_TOKENIZERS:
+            cur.execute(f"DROP TABLE IF EXISTS {table}_{suffix}")
+        for suffix, tokenizer in TOKENIZERS.items():
+            fts = f"{table}_{suffix}"
+            if not cur.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts,)).fetchone():
+                stale.add(table)
+            cur.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{', '.join(cols)}, content='{table}', content_rowid='{pk}', {tokenizer})"
+            )
+        create_fts_triggers(conn, table)
+    conn.commit()
+    if stale:
+        rebuild_fts(conn, sorted(stale))
+
+def match_expression(term):
+    # (index suffix, MATCH expression), or (None, None) for terms too short
+    # for trigrams. Quoted as an FTS5 string so user input is never parsed as
+    # query syntax.
+    term = term.strip()
+    if len(term) < MIN_TRIGRAM:
+        return None, None
+    return "tri", '"' + term.replace('"', '""') + '"'
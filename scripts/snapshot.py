@@ -0,0 +1,268 @@
+"""Columnar analytics snapshots (optional, needs pyarrow).
+
+In analytics mode the "SQL Query Outputs" section no longer reads the live
+SQLite file. The four tables are copied, in one read transaction, into Arrow
+IPC files under SNAPSHOT_DIR, with city/type/status columns
+dictionary-encoded. The files are memory-mapped back, and every SQL_QUERIES
+entry is answered by a vectorized group-by/join over them (ANALYTICS below).
+A snapshot older than max_age seconds is refreshed on a background thread
+while the previous one keeps serving, so dashboard traffic never waits on
+(or holds) the database lock that CRUD writes need.
+
+    python -m scripts.snapshot --db db/food_wastage.db
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # analytics mode is simply unavailable
+    pa = pc = None
+
+from scripts.create_tables import TABLE_KEYS
+
+SNAPSHOT_DIR = "db/snapshots"
+SNAPSHOT_MAX_AGE = 300  # seconds
+CHUNK_ROWS = 50_000
+
+DICTIONARY_COLUMNS = {
+    "providers": ["Type", "City"],
+    "receivers": ["Type", "City"],
+    "food_listings": ["Food_Name", "Provider_Type", "Location", "Food_Type", "Meal_Type"],
+    "claims": ["Status"],
+}
+
+# Archived claims live in monthly partitions; the snapshot keeps all of them
+SOURCES = {"claims": "claims_all"}
+
+def available():
+    return pa is not None
+
+def _schema(conn, table):
+    fields = []
+    for _, name, decl, *_ in conn.execute(f"PRAGMA table_info({table})"):
+        fields.append(pa.field(name, pa.int64() if "INT" in (decl or "").upper() else pa.string()))
+    return pa.schema(fields)
+
+def _read_table(conn, table):
+    schema = _schema(conn, table)
+    cur = conn.execute(f"SELECT {', '.join(schema.names)} FROM {SOURCES.get(table, table)}")
+    batches = []
+    while True:
+        rows = cur.fetchmany(CHUNK_ROWS)
+        if not rows:
+            break
+        columns = list(zip(*rows))
+        batches.append(pa.record_batch(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema
+        ))
+    data = pa.Table.from_batches(batches, schema=schema).combine_chunks()
+    for name in DICTIONARY_COLUMNS.get(table, ()):
+        i = data.schema.get_field_index(name)
+        data = data.set_column(i, name, data.column(i).dictionary_encode())
+    return data
+
+def write_snapshot(db_path, directory=SNAPSHOT_DIR):
+    # One read transaction, so the four files agree with each other
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        tables = {table: _read_table(conn, table) for table in TABLE_KEYS}
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    for table, data in tables.items():
+        path = os.path.join(directory, f"{table}.arrow")
+        with pa.OSFile(path + ".tmp", "wb") as sink:
+            with pa.ipc.new_file(sink, data.schema) as writer:
+                writer.write_table(data)
+        os.replace(path + ".tmp", path)
+    return {table: data.num_rows for table, data in tables.items()}
+
+def read_snapshot(directory=SNAPSHOT_DIR):
+    # Zero-copy: the tables point into the memory-mapped files
+    tables = {}
+    for table in TABLE_KEYS:
+        source = pa.memory_map(os.path.join(directory, f"{table}.arrow"), "r")
+        tables[table] = pa.ipc.open_file(source).read_all()
+    return tables
+
+def snapshot_time(directory=SNAPSHOT_DIR):
+    try:
+        return min(os.path.getmtime(os.path.join(directory, f"{t}.arrow")) for t in TABLE_KEYS)
+    except OSError:
+        return None
+
+# ---------- vectorized SQL_QUERIES ----------
+def _plain(table, columns):
+    # Joins take dictionary columns only as keys, so decode the payload
+    out = table.select(columns)
+    for i, field in enumerate(out.schema):
+        if pa.types.is_dictionary(field.type):
+            out = out.set_column(i, field.name, out.column(i).cast(field.type.value_type))
+    return out
+
+def _group(table, key, agg_col, fn, out, order="descending", limit=None, digits=None):
+    res = table.group_by(key).aggregate([(agg_col, fn)])
+    res = res.select([key, f"{agg_col}_{fn}"]).rename_columns([key, out])
+    if digits is not None:
+        res = res.set_column(1, out, pc.round(res.column(1), digits))
+    res = res.sort_by([(out, order)])
+    return res.slice(0, limit) if limit else res
+
+def _where(table, column, value, columns):
+    plain = _plain(table, columns + [column])
+    return plain.filter(pc.equal(plain[column], value)).select(columns)
+
+def _completed(claims):
+    return _where(claims, "Status", "Completed", ["Claim_ID", "Food_ID", "Receiver_ID"])
+
+def _claims_food(t, claims=None, food_cols=("Food_ID",)):
+    claims = _plain(claims if claims is not None else t["claims"], ["Claim_ID", "Food_ID", "Receiver_ID"])
+    return claims.join(_plain(t["food_listings"], list(food_cols)), "Food_ID", join_type="inner")
+
+def _status_percentage(t):
+    claims = t["claims"]
+    res = _group(claims, "Status", "Claim_ID", "count", "percentage")
+    pct = pc.round(pc.multiply(pc.divide(pc.cast(res["percentage"], pa.float64()), claims.num_rows), 100), 2)
+    return res.set_column(1, "percentage", pct)
+
+ANALYTICS = {
+    "Providers per city":
+        lambda t: _group(t["providers"], "City", "Provider_ID", "count", "total_providers"),
+    "Receivers per city":
+        lambda t: _group(t["receivers"], "City", "Receiver_ID", "count", "total_receivers"),
+    "Top food provider types":
+        lambda t: _group(t["providers"], "Type", "Provider_ID", "count", "contributions"),
+    "Provider contacts by city (use sidebar filter)":
+        lambda t, city: _where(t["providers"], "City", city, ["Name", "Type", "Contact"]).sort_by("Name"),
+    "Top receivers by claims":
+        lambda t: _group(
+            _plain(t["claims"], ["Claim_ID", "Receiver_ID"]).join(
+                _plain(t["receivers"], ["Receiver_ID", "Name"]), "Receiver_ID", join_type="inner"),
+            "Name", "Claim_ID", "count", "claims"),
+    "Total food quantity available":
+        lambda t: pa.table({"total_quantity": [pc.sum(t["food_listings"]["Quantity"]).as_py()]}),
+    "City with most food listings":
+        lambda t: _group(t["food_listings"], "Location", "Food_ID", "count", "listings", limit=5),
+    "Most common food types":
+        lambda t: _group(t["food_listings"], "Food_Type", "Food_ID", "count", "count"),
+    "Most common meal types":
+        lambda t: _group(t["food_listings"], "Meal_Type", "Food_ID", "count", "count"),
+    "Claims per food item":
+        lambda t: _group(_claims_food(t, food_cols=("Food_ID", "Food_Name")),
+                         "Food_Name", "Claim_ID", "count", "total_claims"),
+    "Top provider by successful claims":
+        lambda t: _group(
+            _claims_food(t, _completed(t["claims"]), ("Food_ID", "Provider_ID")).join(
+                _plain(t["providers"], ["Provider_ID", "Name"]), "Provider_ID", join_type="inner"),
+            "Name", "Claim_ID", "count", "success_claims", limit=5),
+    "Claim status percentage": _status_percentage,
+    "Average quantity claimed per receiver (proxy by item qty)":
+        lambda t: _group(
+            _claims_food(t, food_cols=("Food_ID", "Quantity")).join(
+                _plain(t["receivers"], ["Receiver_ID", "Name"]), "Receiver_ID", join_type="inner"),
+            "Name", "Quantity", "mean", "avg_quantity", digits=2),
+    "Most claimed meal type":
+        lambda t: _group(_claims_food(t, food_cols=("Food_ID", "Meal_Type")),
+                         "Meal_Type", "Claim_ID", "count", "claims"),
+    "Total food donated by each provider":
+        lambda t: _group(
+            _plain(t["providers"], ["Provider_ID", "Name"]).join(
+                _plain(t["food_listings"], ["Provider_ID", "Quantity"]), "Provider_ID", join_type="inner"),
+            "Name", "Quantity", "sum", "total_donated"),
+    "Top cities by completed claims":
+        lambda t: _group(_claims_food(t, _completed(t["claims"]), ("Food_ID", "Location")),
+                         "Location", "Claim_ID", "count", "completed_claims").rename_columns(
+                             ["City", "completed_claims"]),
+}
+
+class SnapshotStore:
+    def __init__(self, db_path, directory=SNAPSHOT_DIR, max_age=SNAPSHOT_MAX_AGE):
+        self.db_path = db_path
+        self.directory = directory
+        self.max_age = max_age
+        self.stats = {"refreshes": 0, "last_refresh_s": None, "error": None}
+        self._lock = threading.Lock()
+        self._tables = None
+        self._taken = None
+        self._refreshing = False
+
+    def _refresh(self):
+        started = time.perf_counter()
+        try:
+            write_snapshot(self.db_path, self.directory)
+            tables = read_snapshot(self.directory)
+            with self._lock:
+                self._tables, self._taken = tables, snapshot_time(self.directory)
+                self.stats["refreshes"] += 1
+                self.stats["last_refresh_s"] = round(time.perf_counter() - started, 3)
+                self.stats["error"] = None
+        except (OSError, sqlite3.Error, pa.ArrowException) as e:
+            self.stats["error"] = str(e)
+        finally:
+            self._refreshing = False
+
+    def tables(self):
+        with self._lock:
+            if self._tables is None:
+                taken = snapshot_time(self.directory)
+                if taken is not None:
+                    # Reuse files left by an earlier run or another process
+                    self._tables, self._taken = read_snapshot(self.directory), taken
+            stale = self._taken is None or time.time() - self._taken > self.max_age
+            start = stale and not self._refreshing
+            if start:
+                self._refreshing = True
+        if start:
+            if self._tables is None:
+                self._refresh()  # nothing to serve yet
+            else:
+                threading.Thread(target=self._refresh, name="snapshot-refresh", daemon=True).start()
+        return self._tables
+
+    def age(self):
+        return None if self._taken is None else time.time() - self._taken
+
+    def run(self, name, params=()):
+        tables = self.tables()
+        if tables is None:
+            raise RuntimeError(f"No analytics snapshot: {self.stats['error']}")
+        return ANALYTICS[name](tables, *params).to_pandas()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(db_path, max_age=SNAPSHOT_MAX_AGE, directory=SNAPSHOT_DIR):
+    with _stores_lock:
+        store = _stores.get((db_path, directory))
+        if store is None:
+            store = _stores[(db_path, directory)] = SnapshotStore(db_path, directory, max_age)
+        store.max_age = max_age
+        return store
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="db/food_wastage.db")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args(argv)
+    if not available():
+        raise SystemExit("pyarrow is not installed (pip install pyarrow)")
+    started = time.perf_counter()
+    sizes = write_snapshot(args.db, args.dir)
+    print(f"Snapshot of {sizes} written to {args.dir} in {time.perf_counter() - started:.2f}s")
+    tables = read_snapshot(args.dir)
+    for name, fn in ANALYTICS.items():
+        if name.startswith("Provider contacts"):
+            continue
+        started = time.perf_counter()
+        rows = fn(tables).num_rows
+        print(f"{name:<60} {rows:>8} rows {(time.perf_counter() - started) * 1000:>9.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Concurrent CRUD write stress test.
+
+Simulates --sessions Streamlit sessions, each saving --ops random provider,
+food listing and claim upserts, and reports throughput, per-write latency and
+errors. --mode writer routes every save through scripts/writer.py; --mode
+direct reproduces the old exec_sql (own connection + commit per click) for
+comparison.
+
+    python -m scripts.stress_writes --sessions 40 --ops 100
+    python -m scripts.stress_writes --sessions 40 --ops 100 --mode direct
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from scripts import db, writer
+from scripts.queries import WRITE_QUERIES
+
+SESSIONS = 40
+OPS = 100
+ID_SPACE = 500  # upserts hit IDs 1..ID_SPACE so sessions collide on rows
+
+def random_write(rng):
+    kind = rng.choice(("provider", "food listing", "claim"))
+    key = rng.randint(1, ID_SPACE)
+    if kind == "provider":
+        params = (key, f"Provider {key}", "Restaurant", f"{key} Market Street", "Stressville", "555-0000")
+    elif kind == "food listing":
+        expiry = (date.today() + timedelta(days=rng.randint(0, 10))).isoformat()
+        params = (key, "Rice", rng.randint(1, 50), expiry, rng.randint(1, ID_SPACE),
+                  "Restaurant", "Stressville", "Vegetarian", "Lunch")
+    else:
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        params = (key, rng.randint(1, ID_SPACE), rng.randint(1, ID_SPACE),
+                  rng.choice(("Pending", "Completed", "Cancelled")), ts)
+    return WRITE_QUERIES[f"upsert {kind}"], params
+
+def seed_parents(db_path):
+    # Foreign keys are enforced, so every ID a session can reference must exist
+    keys = range(1, ID_SPACE + 1)
+    expiry = (date.today() + timedelta(days=5)).isoformat()
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany(WRITE_QUERIES["upsert provider"],
+                         [(k, f"Provider {k}", "Restaurant", f"{k} Market Street", "Stressville", "555-0000")
+                          for k in keys])
+        conn.executemany(WRITE_QUERIES["upsert receiver"],
+                         [(k, f"Receiver {k}", "NGO", "Stressville", "555-0000") for k in keys])
+        conn.executemany(WRITE_QUERIES["upsert food listing"],
+                         [(k, "Rice", 10, expiry, k, "Restaurant", "Stressville", "Vegetarian", "Lunch")
+                          for k in keys])
+        conn.commit()
+    finally:
+        conn.close()
+
+def direct_write(db_path, query, params):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(query, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+def run(db_path, sessions=SESSIONS, ops=OPS, mode="writer", seed=0):
+    db.ensure_schema(db_path)
+    seed_parents(db_path)
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(sessions)
+
+    def session(n):
+        rng = random.Random(seed + n)
+        start_gate.wait()
+        for _ in range(ops):
+            query, params = random_write(rng)
+            started = time.perf_counter()
+            try:
+                if mode == "writer":
+                    writer.execute(query, params, db_path)
+                else:
+                    direct_write(db_path, query, params)
+                error = None
+            except sqlite3.Error as e:
+                error = str(e)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if error:
+                    errors[error] = errors.get(error, 0) + 1
+            time.sleep(rng.random() * 0.005)  # think time between clicks
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    result = {
+        "mode": mode,
+        "writes": len(ordered),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "writes_per_sec": round(len(ordered) / seconds),
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+    if mode == "writer":
+        result["writer"] = dict(writer.get_writer(db_path).stats)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to write to (default: a fresh temp database)")
+    parser.add_argument("--sessions", type=int, default=SESSIONS)
+    parser.add_argument("--ops", type=int, default=OPS, help="writes per session")
+    parser.add_argument("--mode", choices=("writer", "direct"), default="writer")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, "stress.db")
+        result = run(db_path, args.sessions, args.ops, args.mode)
+        writer.stop_all()
+        db.close_all()
+    for key, value in result.items():
+        print(f"{key:<16} {value}")
+    return 1 if result["errors"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+"""Set-based validation of upload batches and form saves.
+
+Each CSV chunk is copied into a TEMP staging table (stage_<table>) that has
+the target's column types but none of its constraints. Every rule below is
+then one SQL statement over the whole chunk:
+
+  required     NOT NULL columns left empty
+  integer      INTEGER columns holding text or fractions
+  minimum      Quantity below 0
+  enum         Status outside the CHECK list
+  date         Expiry_Date / Timestamp that date()/datetime() cannot parse
+  foreign key  anti-join against the parent's primary key
+  duplicate    key already in the table, or repeated in the file (append
+               and replace modes; upsert updates instead)
+  archived     key of an archived claim (scripts/archive.py), in every mode
+
+Failing rows land in temp.rejects with the rule that caught them; the clean
+rows go into the target with a single INSERT ... SELECT. The loader returns
+the report, so a bad row costs a report line instead of the whole upload.
+"""
+from scripts.dates import NORMALIZED_COLUMNS
+
+ENUMS = {("claims", "Status"): ("Pending", "Completed", "Cancelled")}
+MINIMUMS = {("food_listings", "Quantity"): 0}
+DATE_CHECKS = {"iso_date": "date", "iso_timestamp": "datetime"}
+ARCHIVED = {"claims": "claims_archived"}  # keys moved out to archive partitions
+
+MAX_REPORT_ROWS = 10_000  # report lines kept per load; the count covers all
+
+REJECTS_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS rejects (
+    Row INTEGER NOT NULL,
+    Col TEXT,
+    Reason TEXT NOT NULL,
+    Value
+)
+"""
+
+def stage_name(table):
+    return f"stage_{table}"
+
+def _info(conn, table):
+    # name -> (declared type, not null, primary key)
+    return {row[1]: (row[2] or "", row[3], row[5]) for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def foreign_keys(conn, table):
+    # column -> (parent table, parent key)
+    return {row[3]: (row[2], row[4]) for row in conn.execute(f"PRAGMA foreign_key_list({table})")}
+
+def create_stage(conn, table, columns):
+    info = _info(conn, table)
+    stage = stage_name(table)
+    conn.execute(f"DROP TABLE IF EXISTS temp.{stage}")
+    cols = ", ".join(f"{c} {info[c][0]}" for c in columns)
+    conn.execute(f"CREATE TEMP TABLE {stage} (_row INTEGER PRIMARY KEY, {cols})")
+    pk = next((c for c in columns if info[c][2]), None)
+    if pk:
+        conn.execute(f"CREATE INDEX temp.{stage}_key ON {stage}({pk})")
+    conn.execute(REJECTS_DDL)
+    return stage
+
+def stage_rows(conn, table, columns, batch):
+    # _row restarts at 1 for every chunk: the table is empty before each insert
+    stage = stage_name(table)
+    conn.execute(f"DELETE FROM {stage}")
+    conn.execute("DELETE FROM temp.rejects")
+    marks = ",".join("?" * len(columns))
+    conn.executemany(f"INSERT INTO {stage} ({', '.join(columns)}) VALUES ({marks})", batch)
+
+def rules(conn, table, columns, mode):
+    # (column, reason, FROM/JOIN tail, WHERE predicate) over stage alias s
+    info = _info(conn, table)
+    fks = foreign_keys(conn, table)
+    out = []
+    for c in info:
+        declared, notnull, pk = info[c]
+        if notnull and not pk and c not in columns:
+            out.append((c, "required", "", "1"))
+    for c in columns:
+        declared, notnull, pk = info[c]
+        if notnull and not pk:
+            out.append((c, "required", "", f"s.{c} IS NULL"))
+        if "INT" in declared.upper():
+            out.append((c, "not an integer", "", f"typeof(s.{c}) NOT IN ('integer', 'null')"))
+        if (table, c) in MINIMUMS:
+            out.append((c, f"below {MINIMUMS[table, c]}", "", f"s.{c} < {MINIMUMS[table, c]}"))
+        if (table, c) in ENUMS:
+            allowed = ", ".join(f"'{v}'" for v in ENUMS[table, c])
+            out.append((c, "not one of " + "/".join(ENUMS[table, c]), "", f"s.{c} NOT IN ({allowed})"))
+        if (table, c) in NORMALIZED_COLUMNS:
+            fn = DATE_CHECKS[NORMALIZED_COLUMNS[table, c]]
+            out.append((c, "not a date", "", f"s.{c} IS NOT NULL AND {fn}(s.{c}) IS NULL"))
+        if c in fks:
+            parent, key = fks[c]
+            out.append((c, f"no such {parent}.{key}",
+                        f"LEFT JOIN {parent} p ON p.{key} = s.{c}",
+                        f"s.{c} IS NOT NULL AND p.{key} IS NULL"))
+        if pk and mode != "upsert":
+            out.append((c, "key already exists", f"JOIN {table} t ON t.{c} = s.{c}", "1"))
+            out.append((c, "key repeated in file", f"JOIN {stage_name(table)} d ON d.{c} = s.{c} AND d._row < s._row",
+                        "1"))
+        if pk and table in ARCHIVED:
+            out.append((c, "key is archived", "", f"s.{c} IN (SELECT {c} FROM {ARCHIVED[table]})"))
+    return out
+
+def check_stage(conn, table, columns, mode, first_row=1):
+    # Runs every rule over the staged chunk; returns (rejected row count,
+    # [(row, column, reason, value)]) with rows numbered from first_row
+    stage = stage_name(table)
+    for col, reason, join, where in rules(conn, table, columns, mode):
+        value = f"s.{col}" if col in columns else "NULL"
+        conn.execute(
+            f"INSERT INTO temp.rejects (Row, Col, Reason, Value) "
+            f"SELECT DISTINCT s._row, ?, ?, {value} FROM {stage} s {join} WHERE {where}",
+            (col, reason),
+        )
+    rejected = conn.execute("SELECT COUNT(DISTINCT Row) FROM temp.rejects").fetchone()[0]
+    report = conn.execute(
+        "SELECT Row + ? - 1, Col, Reason, Value FROM temp.rejects ORDER BY Row LIMIT ?",
+        (first_row, MAX_REPORT_ROWS),
+    ).fetchall()
+    return rejected, report
+
+def clean_select(table, columns):
+    # Source for INSERT INTO <table> (columns) <clean_select>; the WHERE also
+    # keeps an upsert's ON CONFLICT from being read as a join constraint
+    return (f"SELECT {', '.join(columns)} FROM {stage_name(table)} "
+            f"WHERE _row NOT IN (SELECT Row FROM temp.rejects) ORDER BY _row")
+
+def check_row(conn, table, row, mode="upsert"):
+    # Form saves: ["Column: reason", ...] for one row given as {column: value}
+    columns = list(row)
+    create_stage(conn, table, columns)
+    stage_rows(conn, table, columns, [[row[c] for c in columns]])
+    _, report = check_stage(conn, table, columns, mode)
+    conn.execute(f"DROP TABLE temp.{stage_name(table)}")
+    conn.commit()
+    return [f"{col}: {reason}" for _, col, reason, _ in report]
+
+def orphaned(conn, table, tables):
+    # {child table: rows whose key into `table` no longer exists}
+    counts = {}
+    for child in tables:
+        if table not in {parent for parent, _ in foreign_keys(conn, child).values()}:
+            continue
+        n = sum(1 for r in conn.execute(f"PRAGMA foreign_key_check({child})") if r[2] == table)
+        if n:
+            counts[child] = n
+    return counts
@@ -0,0 +1,174 @@
+"""Single background writer for CRUD saves.
+
+Every Streamlit session shares one SQLite file, and SQLite allows one writer at
+a time. Instead of each click opening its own write transaction (and fighting
+over the lock, then paying an fsync), writes are queued to one thread per
+database file. The thread drains the queue into short transactions of up to
+MAX_BATCH statements. Each statement runs inside its own SAVEPOINT, so a bad
+write (constraint error, missing table) fails alone and the rest of the batch
+still commits. Callers get a Future that resolves only after the commit, with
+(lastrowid, rowcount), or raises that statement's sqlite3 error. An optional
+on_commit(query, params, result) callback runs on the writer thread right
+after the commit, so in-process caches see writes in commit order. A callback
+error is logged, never reported as a failed write: the row is already saved.
+logged_since() hands the change log Seq ranges of those commits to
+changelog.ChangeWatcher, which leaves them out of its cross-process polls.
+
+    result = submit(WRITE_QUERIES["upsert claim"], params).result()
+"""
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from scripts import db, perf
+from scripts.changelog import current_seq
+
+MAX_BATCH = 200           # statements per transaction
+BATCH_WINDOW = 0.002      # seconds to wait for more writes after the first
+BUSY_TIMEOUT_MS = 5000    # wait this long for other processes holding the lock
+WRITE_TIMEOUT = 30        # seconds a caller waits for its result
+
+_STOP = object()
+
+log = logging.getLogger("food_wastage.writer")
+
+class Writer:
+    def __init__(self, db_path=db.DB_PATH):
+        self.db_path = db_path
+        self.stats = {"writes": 0, "errors": 0, "batches": 0, "retries": 0, "max_batch": 0,
+                      "callback_errors": 0}
+        self._queue = queue.Queue()
+        self._logged = []  # (after, through] changelog Seq ranges of committed batches
+        self._logged_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"sqlite-writer:{db_path}", daemon=True)
+        self._thread.start()
+
+    def submit(self, query, params=None, on_commit=None):
+        future = Future()
+        self._queue.put((query, tuple(params or ()), future, on_commit))
+        return future
+
+    def logged_since(self, seq):
+        # Ranges ending past seq; older ones are dropped
+        with self._logged_lock:
+            self._logged = [r for r in self._logged if r[1] > seq]
+            return list(self._logged)
+
+    def stop(self, timeout=None):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # ---------- writer thread ----------
+    def _connect(self):
+        db.ensure_schema(self.db_path)
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000,
+                               isolation_level=None, check_same_thread=False)
+        for pragma in db.PRAGMAS:
+            conn.execute(pragma)
+        return perf.trace(conn)
+
+    def _drain(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + BATCH_WINDOW
+        while len(batch) < MAX_BATCH:
+            try:
+                item = self._queue.get(timeout=max(0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _apply(self, conn, batch):
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        # Holding the write lock, so every Seq logged until COMMIT is this batch's
+        first = current_seq(conn)
+        for query, params, _, _ in batch:
+            conn.execute("SAVEPOINT w")
+            try:
+                cur = conn.execute(query, params)
+                results.append(((cur.lastrowid, cur.rowcount), None))
+            except sqlite3.Error as e:
+                conn.execute("ROLLBACK TO w")
+                results.append((None, e))
+            conn.execute("RELEASE w")
+        last = current_seq(conn)
+        conn.execute("COMMIT")
+        if last > first:
+            with self._logged_lock:
+                self._logged.append((first, last))
+        return results
+
+    def _commit(self, conn, batch):
+        # A failure of the transaction itself (still locked after the busy
+        # timeout, disk full) is retried once, then reported to every write.
+        for attempt in range(2):
+            try:
+                return self._apply(conn, batch)
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                error = e
+                self.stats["retries"] += attempt == 0
+        return [(None, error)] * len(batch)
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [w for w in self._drain(item) if w[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            results = self._commit(conn, batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            db.count_query(len(batch))
+            for (query, params, future, on_commit), (value, error) in zip(batch, results):
+                if error is None:
+                    self.stats["writes"] += 1
+                    if on_commit is not None:
+                        try:
+                            on_commit(query, params, value)
+                        except Exception:
+                            self.stats["callback_errors"] += 1
+                            log.exception("on_commit failed after a committed write: %s", query)
+                    future.set_result(value)
+                else:
+                    self.stats["errors"] += 1
+                    future.set_exception(error)
+        conn.close()
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_writer(db_path=db.DB_PATH):
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None:
+            writer = _writers[db_path] = Writer(db_path)
+        return writer
+
+def submit(query, params=None, db_path=db.DB_PATH, on_commit=None):
+    return get_writer(db_path).submit(query, params, on_commit)
+
+def execute(query, params=None, db_path=db.DB_PATH, on_commit=None, timeout=WRITE_TIMEOUT):
+    # Blocking write: returns (lastrowid, rowcount) once committed
+    return submit(query, params, db_path, on_commit).result(timeout)
+
+def stop_all():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.stop()
+
+atexit.register(stop_all)
@@ -0,0 +1,43 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from scripts import frames
+
+@pytest.fixture
+def claims_frame():
+    # Shaped like a dashboard read: pd.read_sql_query over the base tables
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (Claim_ID INTEGER, Food_ID INTEGER, Food_Name TEXT, Location TEXT, "
+                 "Status TEXT, Timestamp TEXT, Expiry_Date TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        (1, 10, "Rice", "Pune", "Pending", "2025-03-01 10:00:00", "2025-03-05"),
+        (2, None, "Bread", "Delhi", "Completed", "2025-03-02 11:30:00", None),
+        (3, 12, "Soup", "Pune", "Cancelled", None, "2025-03-07"),
+    ])
+    df = pd.read_sql_query("SELECT * FROM t", conn)
+    conn.close()
+    return df
+
+def test_compact_dtypes(claims_frame):
+    df = frames.compact(claims_frame)
+    assert isinstance(df["Location"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["Status"].dtype, pd.CategoricalDtype)
+    assert not isinstance(df["Food_Name"].dtype, pd.CategoricalDtype)
+    assert df["Claim_ID"].dtype.kind == "i"  # already integer: left as is
+    assert str(df["Food_ID"].dtype) == "Int64"
+    assert df["Food_ID"].isna().sum() == 1
+    assert df["Timestamp"].dtype.kind == "M"
+    assert df["Expiry_Date"].dtype.kind == "M"
+    assert list(df["Location"].astype(str)) == ["Pune", "Delhi", "Pune"]
+
+def test_compact_keeps_unparsed_dates_as_text():
+    df = frames.compact(pd.DataFrame({"Expiry_Date": ["2025-03-05", "3/5/2025"]}))
+    assert df["Expiry_Date"].dtype.kind != "M"
+    assert list(df["Expiry_Date"]) == ["2025-03-05", "3/5/2025"]
+
+def test_compact_shares_category_dictionaries():
+    a = frames.compact(pd.DataFrame({"City": ["Pune", "Agra"]}))
+    b = frames.compact(pd.DataFrame({"Location": ["Agra", "Surat"]}))
+    assert set(a["City"].cat.categories) <= set(b["Location"].cat.categories)